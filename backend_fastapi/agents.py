@@ -1,22 +1,49 @@
 import os
 import json
-from typing import List, Optional
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 from duckduckgo_search import DDGS
 import google.generativeai as genai
 from models import Claim, Evidence, ScoreResponse, CrisisAlert, CrisisResponse
-import requests
-from bs4 import BeautifulSoup
+from cache import TTLCache, VerdictCache, HttpContentCache, make_cache, normalize_text
+from keyword_matcher import KeywordMatcher
+from dedup import HeadlineClusterer, normalize_headline
+from http_clients import HttpClients
+from link_fetcher import (
+    LinkFetcher, UnsupportedContentError, LINK_FETCH_TIMEOUT, LINK_CACHE_ENABLED, LINK_CACHE_MAX_BYTES
+)
+from prompts import BuiltPrompt, PromptBuilder, UsageTracker, SCORE_INSTRUCTIONS, EXPLAIN_INSTRUCTIONS
+import httpx
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
 
+# Per-stage timeouts (seconds) for evidence gathering in VerifyAgent; LINK_FETCH_TIMEOUT lives in link_fetcher
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "8"))
+
+# Evidence search cache: "memory" or "disk" (persisted under CACHE_DIR)
+EVIDENCE_CACHE_BACKEND = os.getenv("EVIDENCE_CACHE_BACKEND", "memory")
+EVIDENCE_CACHE_SIZE = int(os.getenv("EVIDENCE_CACHE_SIZE", "5000"))
+EVIDENCE_CACHE_TTL = float(os.getenv("EVIDENCE_CACHE_TTL", "21600"))
+
+# Verdict cache for ScoreAgent, always persisted to CACHE_DIR/verdicts.db
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "50000"))
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", "604800"))
+
+# Max claims packed into one LLM request by ScoreAgent.score_many
+BATCH_SCORE_SIZE = int(os.getenv("BATCH_SCORE_SIZE", "8"))
+
 class ScanAgent:
-    def __init__(self):
+    def __init__(self, http: Optional[HttpClients] = None):
         self.api_key = NEWSDATA_API_KEY
+        self.http = http
         if not self.api_key:
             print("WARNING: NEWSDATA_API_KEY not set. Using mock data for news scanning.")
         
@@ -34,41 +61,16 @@ class ScanAgent:
             "social": "entertainment"
         }
 
+        # Remembers headlines across scans so re-reported stories map to one claim
+        self.clusterer = HeadlineClusterer()
+
     def scan_by_category(self, category: str) -> List[Claim]:
         """Scan news by category"""
         claims = []
         
-        # Map frontend category to NewsData category
-        api_category = self.category_mapping.get(category, "top")
-        
         if self.api_key:
             try:
-                from newsdataapi import NewsDataApiClient
-                api = NewsDataApiClient(apikey=self.api_key)
-                print(f"Fetching {category} news (API category: {api_category})...")
-                
-                # Fetch news for specific category
-                response = api.news_api(category=api_category, language="en")
-                
-                if response and 'results' in response:
-                    seen_titles = set()
-                    for article in response['results']:
-                        title = article.get('title', 'No title')
-                        if title not in seen_titles:
-                            seen_titles.add(title)
-                            claims.append(Claim(
-                                text=title,
-                                source=article.get('source_id', 'newsdata'),
-                                status="unverified",
-                                evidence=[Evidence(
-                                    source=article.get('source_id', 'newsdata'),
-                                    content=article.get('description', '') or title,
-                                    url=article.get('link', '')
-                                )]
-                            ))
-                    print(f"Successfully fetched {len(claims)} articles for {category}")
-                else:
-                    print(f"No results from NewsData API for {category}")
+                claims = self.fetch_category(category)
             except ImportError as e:
                 print(f"ERROR: Failed to import newsdataapi: {e}")
             except Exception as e:
@@ -81,6 +83,108 @@ class ScanAgent:
             claims = self._get_mock_news_by_category(category)
         
         return claims
+
+    def fetch_category(self, category: str) -> List[Claim]:
+        """
+        Fetch one category from NewsData. Unlike scan_by_category this raises
+        on any upstream failure instead of returning mock data, so callers
+        that cache results never store the fallback.
+        """
+        if not self.api_key:
+            raise RuntimeError("NEWSDATA_API_KEY not set")
+
+        api = self._newsdata()
+        # Map frontend category to NewsData category
+        api_category = self.api_category(category)
+        print(f"Fetching {category} news (API category: {api_category})...")
+        
+        # Fetch news for specific category
+        response = api.news_api(category=api_category, language="en")
+        if not response or not response.get('results'):
+            raise RuntimeError(f"No results from NewsData API for {category}")
+
+        claims = self._claims_from_articles(response['results'])
+        print(f"Successfully fetched {len(claims)} articles for {category}")
+        return claims
+
+    def _newsdata(self):
+        from newsdataapi import NewsDataApiClient
+        api = NewsDataApiClient(apikey=self.api_key)
+        if self.http and self.http.session:
+            # Reuse pooled connections to newsdata.io instead of a fresh one per call
+            api.request_method = self.http.session
+            api.request_timeout = self.http.timeout
+        return api
+
+    def api_category(self, category: str) -> str:
+        return self.category_mapping.get(category, "top")
+
+    def _claims_from_articles(self, articles: List[dict]) -> List[Claim]:
+        """
+        Turn NewsData articles into claims, folding near-duplicate headlines
+        (syndicated copies, retitled stories) into one claim whose evidence
+        lists every source that carried it.
+        """
+        claims = []
+        by_key = {}
+        clusterer = HeadlineClusterer(max_clusters=len(articles) or 1)
+        for article in articles:
+            title = article.get('title', 'No title') or 'No title'
+            source = article.get('source_id', 'newsdata')
+            evidence = Evidence(
+                source=source,
+                content=article.get('description', '') or title,
+                url=article.get('link', '')
+            )
+            key = str(len(claims))
+            existing = clusterer.assign(normalize_headline(title, article.get('description') or ''), key)
+            if existing is not None:
+                if evidence.url not in {e.url for e in by_key[existing].evidence}:
+                    by_key[existing].evidence.append(evidence)
+                continue
+            claim = Claim(
+                text=title,
+                source=source,
+                status="unverified",
+                evidence=[evidence]
+            )
+            by_key[key] = claim
+            claims.append(claim)
+        return claims
+
+    def dedupe_known(self, claims: List[Claim]) -> Tuple[List[Claim], Dict[str, List[Claim]]]:
+        """
+        Split scanned claims into ones never seen before and re-reports of
+        claims already known from earlier scans. New claims get an id and are
+        remembered; re-reports are returned keyed by the canonical claim id so
+        the caller can attach their sources instead of verifying them again.
+        """
+        new_claims = []
+        merges: Dict[str, List[Claim]] = {}
+        for claim in claims:
+            if not claim.id:
+                claim.id = str(uuid.uuid4())
+            canonical = self.clusterer.assign(self._cluster_text(claim), claim.id)
+            if canonical is None:
+                new_claims.append(claim)
+            else:
+                merges.setdefault(canonical, []).append(claim)
+        if merges:
+            print(f"Folded {len(claims) - len(new_claims)} near-duplicate claims into {len(merges)} known claims")
+        return new_claims, merges
+
+    def remember(self, claims: List[Claim]):
+        """
+        Seed the cross-scan clusters with stored news claims. Claims users
+        submitted (no source) are left out, so headlines never fold into them.
+        """
+        for claim in claims:
+            if claim.id and claim.source:
+                self.clusterer.assign(self._cluster_text(claim), claim.id)
+
+    def _cluster_text(self, claim: Claim) -> str:
+        description = claim.evidence[0].content if claim.evidence else ""
+        return normalize_headline(claim.text, description)
     
     def _get_mock_news_by_category(self, category: str) -> List[Claim]:
         """Generate mock news for a category"""
@@ -107,28 +211,13 @@ class ScanAgent:
         claims = []
         if self.api_key:
             try:
-                from newsdataapi import NewsDataApiClient
-                api = NewsDataApiClient(apikey=self.api_key)
+                api = self._newsdata()
                 print(f"Scanning news with NewsData API...")
                 # Fetch latest news about crisis topics
                 response = api.news_api(q="crisis OR war OR disaster OR emergency OR earthquake OR attack", language="en", country="us")
                 
                 if response and 'results' in response:
-                    seen_titles = set()
-                    for article in response['results']:
-                        title = article.get('title', 'No title')
-                        if title not in seen_titles:
-                            seen_titles.add(title)
-                            claims.append(Claim(
-                                text=title,
-                                source=article.get('source_id', 'newsdata'),
-                                status="unverified",
-                                evidence=[Evidence(
-                                    source=article.get('source_id', 'newsdata'),
-                                    content=article.get('description', '') or title,
-                                    url=article.get('link', '')
-                                )]
-                            ))
+                    claims = self._claims_from_articles(response['results'])
                     print(f"Successfully scanned {len(claims)} news articles")
                 else:
                     print("No results from NewsData API")
@@ -150,316 +239,436 @@ class ScanAgent:
         return claims
 
 class VerifyAgent:
+    search_result_limit = 3
+
+    def __init__(self, search_cache: Optional[TTLCache] = None, http: Optional[HttpClients] = None):
+        # Viral claims get resubmitted many times; reuse their search results
+        self.search_cache = search_cache or make_cache(
+            EVIDENCE_CACHE_BACKEND, "evidence", EVIDENCE_CACHE_SIZE, EVIDENCE_CACHE_TTL
+        )
+        # Streams links with a byte cap instead of downloading whole pages,
+        # and remembers what it extracted so unchanged pages cost a 304
+        link_cache = HttpContentCache(max_bytes=LINK_CACHE_MAX_BYTES) if LINK_CACHE_ENABLED else None
+        self.link_fetcher = LinkFetcher(cache=link_cache)
+        self.http = http
+
     def verify(self, claim: Claim, link: Optional[str] = None, image_content: Optional[bytes] = None) -> Claim:
+        """Blocking wrapper around averify() for scripts and non-async callers."""
+        return asyncio.run(self.averify(claim, link=link, image_content=image_content))
+
+    async def averify(self, claim: Claim, link: Optional[str] = None, image_content: Optional[bytes] = None) -> Claim:
+        """
+        Gather evidence for a claim.
+        The link fetch and every search query run concurrently, each stage
+        bounded by its own timeout, so latency tracks the slowest call.
+        """
+        async for _ in self.averify_events(claim, link=link, image_content=image_content):
+            pass
+        return claim
+
+    async def averify_events(self, claim: Claim, link: Optional[str] = None,
+                             image_content: Optional[bytes] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        averify() as a stream of (stage, data) events, yielded as each stage
+        lands: "link" once the page is read, then one "evidence" per search
+        result (or "search_error"). Evidence is appended to `claim` as it
+        arrives. Closing the generator early cancels the fetch and searches
+        still in flight.
+        """
         print(f"Verifying claim: {claim.text}")
-        
-        # Process Link
-        if link:
-            try:
-                import requests
-                from bs4 import BeautifulSoup
-                print(f"Fetching content from link: {link}")
-                response = requests.get(link, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                title = soup.title.string if soup.title else link
-                text_content = soup.get_text()[:1000] # Limit content
-                
-                claim.evidence.append(Evidence(
-                    source=f"User Link: {title}",
-                    content=f"Extracted content: {text_content}...",
-                    url=link
-                ))
-                
+
+        link_task = asyncio.create_task(self._fetch_link(link)) if link else None
+
+        # Without claim text there is nothing to search for until the link
+        # has been read, so only fan out when we already have a query.
+        search_task = None
+        if claim.text:
+            search_task = asyncio.create_task(self._search(claim.text))
+
+        try:
+            if link_task:
+                evidence, title = await link_task
+                claim.evidence.append(evidence)
                 # If claim text is empty, use the link title/content
-                if not claim.text:
+                if title is not None and not claim.text:
                     claim.text = f"Check content from {link}"
-                print(f"Successfully extracted content from link")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"ERROR: Failed to fetch link {link}: {e}")
-                claim.evidence.append(Evidence(
-                    source="User Link",
-                    content=f"Failed to fetch content from {link}: {str(e)}",
-                    url=link
-                ))
-            except Exception as e:
-                print(f"ERROR: Unexpected error processing link: {e}")
-                claim.evidence.append(Evidence(
-                    source="User Link",
-                    content=f"Error processing link: {str(e)}",
-                    url=link
-                ))
-
-        # Process Image (Placeholder for now)
-        if image_content:
-            print(f"Received image upload ({len(image_content)} bytes)")
-            claim.evidence.append(Evidence(
-                source="User Image",
-                content="Image received. (Vision analysis not yet implemented)",
-                url="Uploaded Image"
-            ))
-            if not claim.text:
-                claim.text = "Verify uploaded image content"
+                yield "link", {"title": title, "evidence": evidence}
 
-        # Perform Search Verification
-        if claim.text:
-            try:
-                # Improve search query to get fact-checking results
-                search_queries = [
-                    f"{claim.text} fact check",
-                    f"{claim.text} snopes",
-                    f"{claim.text} verified"
-                ]
-                
-                print(f"Searching for fact-checking evidence: {claim.text}")
-                with DDGS() as ddgs:
-                    # Try multiple search strategies
-                    all_results = []
-                    for query in search_queries[:2]:  # Use first 2 queries
-                        try:
-                            results = list(ddgs.text(query, max_results=2))
-                            all_results.extend(results)
-                            if len(all_results) >= 3:
-                                break
-                        except:
-                            continue
-                    
-                    # Remove duplicates and limit to 3 results
-                    seen_urls = set()
-                    unique_results = []
-                    for r in all_results:
-                        url = r.get('href', '')
-                        if url and url not in seen_urls:
-                            seen_urls.add(url)
-                            unique_results.append(r)
-                            if len(unique_results) >= 3:
-                                break
-                    
-                    for r in unique_results:
-                        claim.evidence.append(Evidence(
+            # Process Image (Placeholder for now)
+            if image_content:
+                self._add_image_evidence(claim, image_content)
+
+            if search_task is None and claim.text:
+                search_task = asyncio.create_task(self._search(claim.text))
+
+            # Perform Search Verification
+            if search_task:
+                try:
+                    results = await search_task
+                except Exception as e:
+                    print(f"ERROR: DuckDuckGo search failed: {e}")
+                    evidence = Evidence(
+                        source="Search Error",
+                        content=f"Failed to perform web search: {str(e)}",
+                        url=""
+                    )
+                    claim.evidence.append(evidence)
+                    yield "search_error", {"evidence": evidence}
+                else:
+                    print(f"Found {len(results)} fact-checking results")
+                    for r in results:
+                        evidence = Evidence(
                             source=r.get('title', 'Unknown'),
                             content=r.get('body', ''),
                             url=r.get('href', '')
-                        ))
-                    print(f"Found {len(unique_results)} fact-checking results")
-            except Exception as e:
-                print(f"ERROR: DuckDuckGo search failed: {e}")
-                claim.evidence.append(Evidence(
-                    source="Search Error",
-                    content=f"Failed to perform web search: {str(e)}",
-                    url=""
-                ))
-        
-        return claim
+                        )
+                        claim.evidence.append(evidence)
+                        yield "evidence", {"evidence": evidence}
+        finally:
+            for task in (link_task, search_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _fetch_link(self, link: str) -> Tuple[Evidence, Optional[str]]:
+        """Fetch a user link and return (evidence, page title or None on failure)."""
+        try:
+            print(f"Fetching content from link: {link}")
+            client = self.http.async_client if self.http else None
+            page = await asyncio.wait_for(self.link_fetcher.fetch(link, client), timeout=LINK_FETCH_TIMEOUT)
+            title = page.title or link
+            print(f"Successfully extracted content from link ({page.cache}, {page.bytes_read} bytes read)")
+            return Evidence(
+                source=f"User Link: {title}",
+                content=f"Extracted content: {page.text}...",
+                url=link
+            ), title
+        except UnsupportedContentError as e:
+            print(f"WARNING: Skipping link {link}: {e}")
+            return Evidence(
+                source="User Link",
+                content=f"Could not read {link}: {e}",
+                url=link
+            ), None
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            print(f"ERROR: Failed to fetch link {link}: {e!r}")
+            return Evidence(
+                source="User Link",
+                content=f"Failed to fetch content from {link}: {str(e) or 'timed out'}",
+                url=link
+            ), None
+        except Exception as e:
+            print(f"ERROR: Unexpected error processing link: {e}")
+            return Evidence(
+                source="User Link",
+                content=f"Error processing link: {str(e)}",
+                url=link
+            ), None
+
+    def _add_image_evidence(self, claim: Claim, image_content: bytes):
+        print(f"Received image upload ({len(image_content)} bytes)")
+        claim.evidence.append(Evidence(
+            source="User Image",
+            content="Image received. (Vision analysis not yet implemented)",
+            url="Uploaded Image"
+        ))
+        if not claim.text:
+            claim.text = "Verify uploaded image content"
+
+    async def _search(self, claim_text: str) -> List[dict]:
+        """Return cached evidence for the claim, searching only on a cache miss."""
+        cache_key = normalize_text(claim_text)
+        # The evidence cache may be SQLite-backed (EVIDENCE_CACHE_BACKEND=disk)
+        cached = await asyncio.to_thread(self.search_cache.get, cache_key)
+        if cached is not None:
+            print(f"Evidence cache hit: {claim_text}")
+            return cached
+
+        results = await self._search_uncached(claim_text)
+        # Empty results usually mean rate limiting or timeouts, don't pin them
+        if results:
+            await asyncio.to_thread(self.search_cache.set, cache_key, results)
+        return results
+
+    async def _search_uncached(self, claim_text: str) -> List[dict]:
+        """Run every fact-check query concurrently and merge what arrives before the timeout."""
+        # Improve search query to get fact-checking results
+        search_queries = [
+            f"{claim_text} fact check",
+            f"{claim_text} snopes",
+            f"{claim_text} verified"
+        ]
+
+        print(f"Searching for fact-checking evidence: {claim_text}")
+        # DDGS has no async client, so each query gets its own worker thread
+        tasks = [asyncio.create_task(asyncio.to_thread(self._search_query, q)) for q in search_queries]
+        done, pending = await asyncio.wait(tasks, timeout=SEARCH_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"WARNING: {len(pending)} search queries timed out after {SEARCH_TIMEOUT}s")
+
+        # Keep query order so the merge is deterministic regardless of finish order
+        result_lists = []
+        errors = []
+        for task in tasks:
+            if task not in done:
+                continue
+            if task.exception():
+                errors.append(task.exception())
+            else:
+                result_lists.append(task.result())
+
+        if errors and not result_lists and not pending:
+            raise errors[0]
+        return self._merge_results(result_lists)
+
+    def _search_query(self, query: str) -> List[dict]:
+        if self.http and self.http.is_open:
+            return list(self.http.ddgs().text(query, max_results=2))
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=2))
+
+    def _merge_results(self, result_lists: List[List[dict]]) -> List[dict]:
+        # Remove duplicates and limit to 3 results
+        seen_urls = set()
+        unique_results = []
+        for results in result_lists:
+            for r in results:
+                url = r.get('href', '')
+                if url and url not in seen_urls:
+                    seen_urls.add(url)
+                    unique_results.append(r)
+                    if len(unique_results) >= self.search_result_limit:
+                        return unique_results
+        return unique_results
 
 class ScoreAgent:
-    def __init__(self):
+    def __init__(self, verdict_cache: Optional[VerdictCache] = None):
+        # Same claim + same evidence always gets the same verdict, skip the LLM
+        self.verdict_cache = verdict_cache or VerdictCache(max_size=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL)
+        self.prompts = PromptBuilder()
+        self.usage = UsageTracker()
         if GEMINI_API_KEY:
             genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            # Static instructions go in the system prompt so the provider can cache the prefix
+            self.model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=SCORE_INSTRUCTIONS)
         else:
             self.model = None
         if not self.model:
             print("WARNING: GEMINI_API_KEY not set. Scoring will return UNVERIFIED.")
 
     def score(self, claim: Claim) -> ScoreResponse:
+        try:
+            done, built = self._prepare(claim)
+            if done:
+                return done
+            response = self.model.generate_content(built.text)
+            return self._finish(claim, built, response)
+        except Exception as e:
+            return self._scoring_failed(e)
+
+    async def ascore(self, claim: Claim) -> ScoreResponse:
+        """Non-blocking variant of score() using the async Gemini client."""
+        try:
+            # Both halves touch the SQLite verdict cache, so they run on a thread
+            done, built = await asyncio.to_thread(self._prepare, claim)
+            if done:
+                return done
+            response = await self.model.generate_content_async(built.text)
+            return await asyncio.to_thread(self._finish, claim, built, response)
+        except Exception as e:
+            return self._scoring_failed(e)
+
+    def _prepare(self, claim: Claim) -> Tuple[Optional[ScoreResponse], Optional[BuiltPrompt]]:
+        """
+        Everything before the model call: (score, None) when the claim is
+        settled without one (no API key, no usable evidence, a cached
+        verdict), else (None, prompt to send).
+        """
         if not self.model:
-            # Fallback if no API key
             print("ERROR: Cannot score claim - no GEMINI_API_KEY configured")
-            return ScoreResponse(
-                final_score=0,
-                source_reliability=0,
-                evidence_strength=0,
-                consistency=0,
-                verdict="UNVERIFIED"
-            )
+            return self._failed_score(), None
 
-        evidence_text = "\n".join([f"- {e.content} ({e.url})" for e in claim.evidence])
-        prompt = f"""
-        You are an expert fact-checker with advanced analytical reasoning. Your goal is to provide ACCURATE credibility assessment.
-        
-        CRITICAL: Read the evidence CAREFULLY before scoring. Do NOT rush to conclusions.
+        print(f"Scoring claim with Groq AI: {claim.text[:50]}...")
+        early = self._check_evidence(claim)
+        if early:
+            return early, None
 
-        STEP 1: UNDERSTAND THE CLAIM
-        Claim to verify: "{claim.text}"
-        
-        Ask yourself:
-        - What is this claim actually saying?
-        - What would "true" look like? What would "false" look like?
-        - What type of evidence would prove or disprove this?
-        
-        STEP 2: READ ALL EVIDENCE THOROUGHLY
-        Evidence provided:
-        {evidence_text}
-        
-        For EACH piece of evidence, ask:
-        - Is this about the SAME topic as the claim?
-        - Does this SUPPORT the claim, CONTRADICT it, or is it IRRELEVANT?
-        - How RELIABLE is this source?
-        
-        STEP 3: DEEP ANALYSIS
-        Answer these questions carefully:
-        
-        a) RELEVANCE CHECK:
-           - Is the evidence actually about "{claim.text}"?
-           - Or is it about something completely different?
-           - If irrelevant → mark UNVERIFIED
-        
-        b) CONTENT ANALYSIS:
-           - What does each source actually SAY?
-           - Do they confirm or deny the claim?
-           - Are there scientific facts, studies, or expert opinions?
-        
-        c) SOURCE RELIABILITY:
-           - Wikipedia, .edu, .gov, scientific journals, fact-checkers (Snopes, PolitiFact) = HIGH reliability (80-100)
-           - News outlets (BBC, Reuters, AP) = GOOD reliability (70-85)
-           - Blogs, unknown sites, social media = LOW reliability (0-40)
-        
-        d) EVIDENCE CONSISTENCY:
-           - Do all sources agree?
-           - Are there contradictions?
-           - How strong is the consensus?
-        
-        e) SCIENTIFIC BASIS:
-           - Is there scientific consensus?
-           - Are there studies or research cited?
-           - Is this a well-established fact or controversial?
-        
-        STEP 4: CROSS-VERIFY YOUR VERDICT
-        Before deciding, check:
-        - If you think it's FALSE: Did you find evidence that CONTRADICTS the claim?
-        - If you think it's VERIFIED: Did you find evidence that CONFIRMS the claim?
-        - If you think it's MIXED: Did you find BOTH supporting AND contradicting evidence?
-        - If you think it's UNVERIFIED: Is the evidence truly insufficient or irrelevant?
-        
-        STEP 5: ASSIGN ACCURATE SCORES
-        
-        Based on your analysis, use this EXACT logic:
-        
-        1. final_score (Overall credibility):
-           - VERIFIED (evidence confirms claim): 75-95
-             Examples: 85 for strong confirmation, 92 for very strong
-           - FALSE (evidence contradicts claim): 10-25
-             Examples: 15 for clearly debunked, 22 for partially debunked
-           - MIXED (contradictory evidence): 40-60
-             Examples: 45 if leaning false, 55 if leaning true
-           - UNVERIFIED (no relevant evidence): 45-55
-             Examples: 50 for neutral lack of evidence
-        
-        2. source_reliability (0-100):
-           - Count how many sources are reliable
-           - Wikipedia, fact-checkers, .edu = 85-95
-           - News sites = 70-80
-           - Blogs, unknown = 20-40
-        
-        3. evidence_strength (0-100):
-           - Is evidence conclusive? 80-95
-           - Is evidence moderate? 50-70
-           - Is evidence weak/vague? 20-40
-        
-        4. consistency (0-100):
-           - All sources agree? 90-100
-           - Most agree? 70-85
-           - Mixed opinions? 45-55
-           - Contradictory? 20-40
-        
-        5. verdict (VERIFIED/FALSE/MIXED/UNVERIFIED):
-           Choose based on your analysis above
-        
-        VERIFICATION RULES:
-        ✓ If verdict = FALSE, final_score MUST be 10-25 (NOT 0)
-        ✓ If verdict = VERIFIED, final_score MUST be 75-95 (NOT 100)
-        ✓ Scores MUST align with verdict logic
-        ✓ Read evidence content, don't just guess
-        
-        EXAMPLES OF CORRECT ANALYSIS:
-        
-        1. Claim: "Earth is flat"
-           Evidence: "Wikipedia: Earth is an oblate spheroid. Scientific consensus confirms spherical shape."
-           Analysis: Evidence clearly contradicts claim. Sources are reliable (Wikipedia, science). Strong evidence.
-           → {{"final_score": 18, "source_reliability": 92, "evidence_strength": 90, "consistency": 95, "verdict": "FALSE"}}
-        
-        2. Claim: "Vaccines cause autism"
-           Evidence: "CDC: No link found. Multiple peer-reviewed studies show no connection."
-           Analysis: Evidence contradicts claim. Highly reliable sources. Scientific consensus.
-           → {{"final_score": 12, "source_reliability": 95, "evidence_strength": 95, "consistency": 100, "verdict": "FALSE"}}
-        
-        3. Claim: "Coffee is healthy"
-           Evidence: "Study A: Coffee reduces diabetes risk. Study B: High consumption may increase anxiety."
-           Analysis: Mixed evidence. Some benefits, some risks. Both from studies.
-           → {{"final_score": 55, "source_reliability": 75, "evidence_strength": 70, "consistency": 45, "verdict": "MIXED"}}
-        
-        Return ONLY a JSON object (no explanation):
-        {{"final_score": <number>, "source_reliability": <number>, "evidence_strength": <number>, "consistency": <number>, "verdict": "<string>"}}
+        cached = self.verdict_cache.get(claim.text, claim.evidence)
+        if cached:
+            print(f"Verdict cache hit: {cached.verdict}")
+            return cached, None
+        return None, self.prompts.score_prompt(claim)
+
+    def _finish(self, claim: Claim, built: BuiltPrompt, response) -> ScoreResponse:
+        """Parse the model's answer, record its token usage and cache the verdict."""
+        result = self._parse_response(response.text)
+        result.usage = self.usage.record(response, built)
+        self.verdict_cache.set(claim.text, claim.evidence, result)
+        return result
+
+    def _scoring_failed(self, error: Exception) -> ScoreResponse:
+        if isinstance(error, json.JSONDecodeError):
+            print(f"ERROR: Failed to parse Groq response as JSON: {error}")
+        else:
+            print(f"ERROR: Groq API call failed: {error}")
+        return self._failed_score()
+
+    def score_many(self, claims: List[Claim]) -> List[ScoreResponse]:
         """
-        
+        Score several claims, packing up to BATCH_SCORE_SIZE of them into a
+        single LLM request. Items the model answers badly are split off and
+        retried on their own, so one bad verdict never costs the whole batch.
+        """
+        if not self.model:
+            print("ERROR: Cannot score claims - no GEMINI_API_KEY configured")
+            return [self._failed_score() for _ in claims]
+
+        results: List[Optional[ScoreResponse]] = [None] * len(claims)
+        pending = []
+        for i, claim in enumerate(claims):
+            early = self._check_evidence(claim)
+            if early:
+                results[i] = early
+                continue
+            cached = self.verdict_cache.get(claim.text, claim.evidence)
+            if cached:
+                results[i] = cached
+                continue
+            pending.append(i)
+
+        print(f"Batch scoring {len(pending)} of {len(claims)} claims ({len(claims) - len(pending)} resolved locally)")
         try:
-            print(f"Scoring claim with Groq AI: {claim.text[:50]}...")
-            
-            # Check if we have any meaningful evidence
-            if not claim.evidence or len(claim.evidence) == 0:
-                print("WARNING: No evidence found for claim")
-                return ScoreResponse(
-                    final_score=50,
-                    source_reliability=0,
-                    evidence_strength=0,
-                    consistency=0,
-                    verdict="UNVERIFIED"
-                )
-            
-            # Check if evidence has content
-            has_content = any(e.content and len(e.content.strip()) > 10 for e in claim.evidence)
-            if not has_content:
-                print("WARNING: Evidence found but no meaningful content")
-                return ScoreResponse(
-                    final_score=50,
-                    source_reliability=30,
-                    evidence_strength=20,
-                    consistency=50,
-                    verdict="UNVERIFIED"
-                )
-            
-            
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-            result_text = result_text.strip()
-            
-            result = json.loads(result_text)
-            print(f"Scoring complete: {result.get('verdict', 'UNKNOWN')}, Score: {result.get('final_score', 0)}")
-            return ScoreResponse(**result)
-        except json.JSONDecodeError as e:
-            print(f"ERROR: Failed to parse Groq response as JSON: {e}")
+            for start in range(0, len(pending), BATCH_SCORE_SIZE):
+                self._score_batch(claims, pending[start:start + BATCH_SCORE_SIZE], results)
+        except Exception as e:
+            # The API itself failed (rate limit, timeout, outage); further calls would only fail the same way
+            print(f"ERROR: Batch scoring stopped on an LLM API error: {e}")
+        return [result if result is not None else self._failed_score() for result in results]
+
+    def _score_batch(self, claims: List[Claim], indices: List[int], results: List[Optional[ScoreResponse]]):
+        """
+        Score `indices` in one request. Errors from the API call propagate to
+        score_many; only verdicts that fail to parse are split off and retried.
+        """
+        if len(indices) == 1:
+            claim = claims[indices[0]]
+            built = self.prompts.score_prompt(claim)
+            response = self.model.generate_content(built.text)
+            try:
+                result = self._parse_response(response.text)
+            except ValueError as e:  # Covers JSON and schema errors
+                print(f"ERROR: Failed to parse verdict for claim {claim.id}: {e}")
+                results[indices[0]] = self._failed_score()
+                return
+            result.usage = self.usage.record(response, built)
+            self.verdict_cache.set(claim.text, claim.evidence, result)
+            results[indices[0]] = result
+            return
+
+        built = self.prompts.batch_score_prompt([claims[i] for i in indices])
+        response = self.model.generate_content(built.text)
+        self.usage.record(response, built)
+        try:
+            parsed = self._parse_batch_response(response.text, len(indices))
+        except ValueError as e:
+            print(f"ERROR: Batch verdicts for {len(indices)} claims unparseable: {e}")
+            parsed = [None] * len(indices)
+
+        failed = []
+        for i, score in zip(indices, parsed):
+            if score is None:
+                failed.append(i)
+            else:
+                results[i] = score
+                self.verdict_cache.set(claims[i].text, claims[i].evidence, score)
+        if not failed:
+            return
+
+        print(f"WARNING: {len(failed)} of {len(indices)} batch verdicts unusable, retrying them")
+        if len(failed) < len(indices):
+            self._score_batch(claims, failed, results)
+        else:
+            # Nothing parsed at all: halve so a single poisoned item can't sink the rest
+            middle = len(failed) // 2
+            self._score_batch(claims, failed[:middle], results)
+            self._score_batch(claims, failed[middle:], results)
+
+    def _parse_batch_response(self, result_text: str, count: int) -> List[Optional[ScoreResponse]]:
+        """Map a JSON array of verdicts back to batch positions, None where an item is missing or invalid."""
+        data = json.loads(self._strip_code_fence(result_text))
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array of verdicts")
+
+        parsed: List[Optional[ScoreResponse]] = [None] * count
+        for item in data:
+            try:
+                position = int(item.pop("id"))
+                if 0 <= position < count and parsed[position] is None:
+                    parsed[position] = ScoreResponse(**item)
+            except Exception:
+                continue
+        return parsed
+
+    def _failed_score(self) -> ScoreResponse:
+        return ScoreResponse(
+            final_score=0,
+            source_reliability=0,
+            evidence_strength=0,
+            consistency=0,
+            verdict="UNVERIFIED"
+        )
+
+    def _check_evidence(self, claim: Claim) -> Optional[ScoreResponse]:
+        """Return a neutral score when there is nothing worth sending to the model."""
+        # Check if we have any meaningful evidence
+        if not claim.evidence or len(claim.evidence) == 0:
+            print("WARNING: No evidence found for claim")
             return ScoreResponse(
-                final_score=0,
+                final_score=50,
                 source_reliability=0,
                 evidence_strength=0,
                 consistency=0,
                 verdict="UNVERIFIED"
             )
-        except Exception as e:
-            print(f"ERROR: Groq API call failed: {e}")
+        
+        # Check if evidence has content
+        has_content = any(e.content and len(e.content.strip()) > 10 for e in claim.evidence)
+        if not has_content:
+            print("WARNING: Evidence found but no meaningful content")
             return ScoreResponse(
-                final_score=0,
-                source_reliability=0,
-                evidence_strength=0,
-                consistency=0,
+                final_score=50,
+                source_reliability=30,
+                evidence_strength=20,
+                consistency=50,
                 verdict="UNVERIFIED"
             )
+        return None
+
+    def _strip_code_fence(self, result_text: str) -> str:
+        result_text = result_text.strip()
+        
+        # Remove markdown code blocks if present
+        if result_text.startswith("```json"):
+            result_text = result_text[7:]
+        if result_text.startswith("```"):
+            result_text = result_text[3:]
+        if result_text.endswith("```"):
+            result_text = result_text[:-3]
+        return result_text.strip()
+
+    def _parse_response(self, result_text: str) -> ScoreResponse:
+        result = json.loads(self._strip_code_fence(result_text))
+        print(f"Scoring complete: {result.get('verdict', 'UNKNOWN')}, Score: {result.get('final_score', 0)}")
+        return ScoreResponse(**result)
 
 class ExplainAgent:
     def __init__(self):
+        self.prompts = PromptBuilder()
+        self.usage = UsageTracker()
         if GEMINI_API_KEY:
             genai.configure(api_key=GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=EXPLAIN_INSTRUCTIONS)
         else:
             self.model = None
         if not self.model:
@@ -471,51 +680,151 @@ class ExplainAgent:
             return "We analyzed the claim and available evidence to provide a credibility assessment."
 
         try:
-            prompt = f"""
-            You are an expert fact-checker. Based on the following verification result, provide a clear, 
-            concise explanation (2-3 sentences) for the general public about why this claim received this score.
-            
-            Claim Verified: {result.get('claim', 'N/A')}
-            Verdict: {result.get('verdict', 'UNVERIFIED')}
-            Credibility Score: {result.get('score', 0)}/100
-            
-            Explain in simple language why the claim received this verdict and score.
-            """
-            
-            response = self.model.generate_content(prompt)
+            built = self.prompts.explain_prompt(result)
+            response = self.model.generate_content(built.text)
+            self.usage.record(response, built)
             print(f"Explanation generated successfully")
             return response.text.strip()
         except Exception as e:
             print(f"ERROR: Failed to generate explanation: {e}")
             return f"Error generating explanation: {str(e)}"
 
+# Crisis keywords weighted by how strongly they signal an actual emergency.
+# Mass-casualty events weigh most, places and generic news words least.
+CRISIS_KEYWORDS = {
+    "earthquake": 3, "tsunami": 3, "pandemic": 3, "terror": 3, "terrorist": 3, "terrorism": 3,
+    "airstrike": 3, "missile": 3, "bomb": 3, "explosion": 3, "assassinated": 3, "killed": 3,
+    "war": 3, "attack": 2.5, "blast": 2.5, "murder": 2.5, "shoot": 2.5, "dead": 2, "deadly": 2,
+    "hurricane": 2.5, "typhoon": 2.5, "cyclone": 2.5, "tornado": 2.5, "wildfire": 2.5,
+    "flood": 2, "violence": 2, "conflict": 2, "disaster": 2, "emergency": 2, "crisis": 1.5,
+    "fire": 1.5, "storm": 1.5, "crash": 1.5, "accident": 1.5, "strike": 1.5, "military": 1.5,
+    "navy": 1, "gun": 1.5, "threat": 1.5, "danger": 1.5, "rescue": 1.5, "heat": 1,
+    "russia": 1, "israel": 1, "lebanon": 1, "gaza": 1, "ukraine": 1, "iran": 1,
+    "police": 0.5, "arrest": 0.5, "crime": 0.5, "warning": 1, "alert": 1, "weather": 0.5,
+    "breaking": 0.5,
+}
+
+# Accepted word forms per keyword. Listed explicitly rather than produced by
+# suffix rules, which also turned "ward", "wares", "heating" and "fired" into hits.
+CRISIS_KEYWORD_FORMS = {
+    "earthquake": ("earthquakes",), "tsunami": ("tsunamis",), "pandemic": ("pandemics",),
+    "terrorist": ("terrorists",), "airstrike": ("airstrikes",), "missile": ("missiles",),
+    "bomb": ("bombs", "bombed", "bombing", "bombings", "bomber", "bombers"),
+    "explosion": ("explosions",),
+    "war": ("wars", "warfare", "warship", "warships", "warplane", "warplanes", "wartime"),
+    "attack": ("attacks", "attacked", "attacking", "attacker", "attackers"),
+    "blast": ("blasts",), "murder": ("murders", "murdered", "murderer", "murderers"),
+    "shoot": ("shoots", "shooting", "shootings", "shooter", "shooters", "shootout"),
+    "deadly": ("deadliest",),
+    "hurricane": ("hurricanes",), "typhoon": ("typhoons",), "cyclone": ("cyclones",),
+    "tornado": ("tornadoes", "tornados"), "wildfire": ("wildfires",),
+    "flood": ("floods", "flooded", "flooding", "floodwaters"),
+    "conflict": ("conflicts",), "disaster": ("disasters",), "emergency": ("emergencies",),
+    "crisis": ("crises",),
+    "fire": ("fires", "firefighter", "firefighters"),
+    "storm": ("storms",), "crash": ("crashes", "crashed"), "accident": ("accidents",),
+    "strike": ("strikes",),
+    "gun": ("guns", "gunman", "gunmen", "gunfire", "gunshot", "gunshots"),
+    "threat": ("threats", "threaten", "threatens", "threatened", "threatening"),
+    "danger": ("dangers", "dangerous"), "rescue": ("rescues", "rescued", "rescuer", "rescuers"),
+    "heat": ("heatwave", "heatwaves"),
+    "russia": ("russian", "russians"), "israel": ("israeli", "israelis"),
+    "ukraine": ("ukrainian", "ukrainians"), "iran": ("iranian", "iranians"),
+    "gaza": ("gazan", "gazans"),
+    "arrest": ("arrests", "arrested"), "crime": ("crimes",),
+    "warning": ("warnings",), "alert": ("alerts",),
+}
+
+# Built once at import; matching a headline is a single tokenizing pass
+crisis_matcher = KeywordMatcher(CRISIS_KEYWORDS, forms=CRISIS_KEYWORD_FORMS)
+
+# Alerts retained in memory for /api/crisis cursors
+MAX_CRISIS_ALERTS = int(os.getenv("MAX_CRISIS_ALERTS", "1000"))
+
+
 class CrisisAgent:
+    """
+    Keeps a materialized, append-only list of crisis alerts. Claims are
+    matched once as they are ingested; readers page through the alerts with
+    a sequence cursor instead of rescanning every claim.
+    """
+
+    def __init__(self, matcher: KeywordMatcher = crisis_matcher, max_alerts: int = MAX_CRISIS_ALERTS):
+        self.matcher = matcher
+        self.max_alerts = max_alerts
+        self._alerts: List[CrisisAlert] = []
+        self._first_seq = 1  # sequence number of self._alerts[0]
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> int:
+        """Sequence number of the newest alert (0 when there are none)."""
+        return self._first_seq + len(self._alerts) - 1
+
+    def severity(self, weight: float) -> str:
+        if weight >= 6:
+            return "CRITICAL"
+        if weight >= 3:
+            return "HIGH"
+        if weight >= 1.5:
+            return "MEDIUM"
+        return "LOW"
+
+    def ingest(self, claims: List[Claim]) -> List[CrisisAlert]:
+        """Match new claims once and append any resulting alerts."""
+        new_alerts = []
+        with self._lock:
+            for claim in claims:
+                key = claim.id or claim.text
+                if key in self._seen:
+                    continue
+                self._seen[key] = None
+                alert = self._alert(claim)
+                if alert:
+                    self._alerts.append(alert)
+                    new_alerts.append(alert)
+
+            # Trim in bulk so appends stay amortized O(1)
+            while len(self._seen) > self.max_alerts * 10:
+                self._seen.popitem(last=False)
+            overflow = len(self._alerts) - self.max_alerts
+            if overflow > self.max_alerts // 2:
+                del self._alerts[:overflow]
+                self._first_seq += overflow
+        return new_alerts
+
+    def alerts_since(self, cursor: int = 0) -> CrisisResponse:
+        """Alerts newer than `cursor` (0 returns everything retained)."""
+        with self._lock:
+            start = max(0, cursor - self._first_seq + 1)
+            alerts = self._alerts[start:]
+            latest = self.cursor
+        return self._response(alerts, latest)
+
     def detect_crisis(self, claims: List[Claim]) -> CrisisResponse:
-        alerts = []
-        keywords = [
-            "earthquake", "pandemic", "violence", "tsunami", "terror", "flood", "war", "attack", "assassinated", 
-            "airstrike", "conflict", "dead", "killed", "crisis", "warning", "strike", "military", "navy", 
-            "russia", "israel", "lebanon", "gaza", "ukraine", "iran", "missile", "bomb", "blast", "explosion", 
-            "fire", "wildfire", "storm", "hurricane", "tornado", "typhoon", "cyclone", "weather", "heat", 
-            "emergency", "rescue", "police", "arrest", "shoot", "gun", "crime", "murder", "crash", "accident", 
-            "disaster", "danger", "threat", "alert", "breaking"
-        ]
-        
-        for claim in claims:
-            detected_keywords = [k for k in keywords if k in claim.text.lower()]
-            if detected_keywords:
-                alerts.append(CrisisAlert(
-                    id=str(hash(claim.text)),
-                    title="Potential Crisis Detected",
-                    severity="HIGH", # Simplified logic
-                    region="Unknown", # Would need NER for this
-                    verified=claim.status == "verified",
-                    keywords=detected_keywords,
-                    description=claim.text
-                ))
-        
+        """Stateless one-off check of a claim list."""
+        alerts = [alert for alert in (self._alert(claim) for claim in claims) if alert]
+        return self._response(alerts)
+
+    def _alert(self, claim: Claim) -> Optional[CrisisAlert]:
+        match = self.matcher.match(claim.text)
+        if not match:
+            return None
+        return CrisisAlert(
+            id=str(hash(claim.text)),
+            title="Potential Crisis Detected",
+            severity=self.severity(match["weight"]),
+            region="Unknown", # Would need NER for this
+            verified=claim.status == "verified",
+            keywords=match["keywords"],
+            description=claim.text
+        )
+
+    def _response(self, alerts: List[CrisisAlert], cursor: Optional[int] = None) -> CrisisResponse:
         return CrisisResponse(
             crisis_detected=len(alerts) > 0,
             alerts=alerts,
-            recommended_actions=["Monitor situation", "Verify sources"] if alerts else []
+            recommended_actions=["Monitor situation", "Verify sources"] if alerts else [],
+            cursor=cursor
         )
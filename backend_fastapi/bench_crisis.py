@@ -0,0 +1,76 @@
+"""
+Benchmark: crisis keyword detection over synthetic headlines.
+Compares the old per-keyword substring scan with the compiled KeywordMatcher.
+
+Usage: python bench_crisis.py [headline_count]
+"""
+import sys
+import time
+import random
+from agents import CRISIS_KEYWORDS, crisis_matcher
+
+# Substring scan as CrisisAgent.detect_crisis did it before the matcher
+NAIVE_KEYWORDS = [
+    "earthquake", "pandemic", "violence", "tsunami", "terror", "flood", "war", "attack", "assassinated",
+    "airstrike", "conflict", "dead", "killed", "crisis", "warning", "strike", "military", "navy",
+    "russia", "israel", "lebanon", "gaza", "ukraine", "iran", "missile", "bomb", "blast", "explosion",
+    "fire", "wildfire", "storm", "hurricane", "tornado", "typhoon", "cyclone", "weather", "heat",
+    "emergency", "rescue", "police", "arrest", "shoot", "gun", "crime", "murder", "crash", "accident",
+    "disaster", "danger", "threat", "alert", "breaking"
+]
+
+FILLER = (
+    "city council approves new budget for local schools after long debate over funding priorities "
+    "award winning theater company announces summer season and ticket sales start monday "
+    "tech firm unveils smartphone with improved camera battery and faster charging "
+    "researchers publish study on sleep habits of teenagers across several countries "
+    "stocks close higher as investors weigh inflation data and central bank guidance "
+    "coach praises players after dramatic overtime win in championship game "
+    "warehouse hiring surge continues ahead of holiday shopping season retailers say"
+).split()
+
+
+def make_headlines(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    keywords = list(CRISIS_KEYWORDS)
+    headlines = []
+    for _ in range(count):
+        words = rng.sample(FILLER, rng.randint(8, 14))
+        # Roughly a third of headlines mention a crisis keyword
+        if rng.random() < 0.35:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        headlines.append(" ".join(words).capitalize())
+    return headlines
+
+
+def naive(headlines):
+    return [[k for k in NAIVE_KEYWORDS if k in h.lower()] for h in headlines]
+
+
+def compiled(headlines):
+    return [crisis_matcher.find(h) for h in headlines]
+
+
+def bench(fn, headlines, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(headlines)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    headlines = make_headlines(count)
+
+    naive_time, naive_hits = bench(naive, headlines)
+    compiled_time, compiled_hits = bench(compiled, headlines)
+
+    naive_flagged = sum(1 for k in naive_hits if k)
+    compiled_flagged = sum(1 for k in compiled_hits if k)
+    print(f"Headlines:          {count:,}")
+    print(f"Substring scan:     {naive_time:.3f}s ({naive_time / count * 1e6:.2f} us/headline), {naive_flagged:,} flagged")
+    print(f"KeywordMatcher:     {compiled_time:.3f}s ({compiled_time / count * 1e6:.2f} us/headline), {compiled_flagged:,} flagged")
+    print(f"Speedup:            {naive_time / compiled_time:.1f}x")
+    print(f"False positives removed (e.g. 'war' in 'award', 'heat' in 'theater'): {naive_flagged - compiled_flagged:,}")
@@ -0,0 +1,61 @@
+"""
+Benchmark: /api/forensics analysis throughput.
+Builds synthetic camera-like JPEGs at several sizes, reports the per-check
+time of one analysis per size, then images per second through the
+worker process pool at increasing worker counts.
+
+Usage: python bench_forensics.py [images_per_run] [max_workers]
+"""
+import io
+import os
+import sys
+import time
+import asyncio
+import numpy as np
+from PIL import Image
+from forensics import analyze_image_bytes
+from worker_pool import WorkerPool
+from bench_spectral_detector import scene
+
+SIZES = {"1 MP": (1152, 864), "4 MP": (2304, 1728), "12 MP": (4000, 3000)}
+
+
+def make_jpeg(width: int, height: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    # Scenes are synthesized small and scaled up, then given sensor noise at full size
+    image = Image.fromarray(np.clip(scene(height // 4, width // 4, rng), 0, 255).astype(np.uint8))
+    image = np.asarray(image.resize((width, height), Image.Resampling.BICUBIC), dtype=np.float32)
+    image = image + rng.normal(0, 3, image.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+async def throughput(images, workers: int) -> float:
+    pool = WorkerPool(workers)
+    pool.start()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.run(analyze_image_bytes, data) for data in images))
+        return len(images) / (time.perf_counter() - started)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else min(4, os.cpu_count() or 1)
+
+    samples = {name: make_jpeg(w, h, i) for i, (name, (w, h)) in enumerate(SIZES.items())}
+    # The samples are clean single-compressed JPEGs, so the score doubles as a calibration check
+    print(f"{'image':>6} {'bytes':>9} {'score':>5} | per-check ms")
+    for name, data in samples.items():
+        analyze_image_bytes(data)  # Warm up imports and caches
+        report = analyze_image_bytes(data)
+        print(f"{name:>6} {len(data):>9} {report['defakeScore']:>5} | "
+              + "  ".join(f"{k} {v:.0f}" for k, v in report["timings_ms"].items()))
+
+    images = [samples[name] for name in ("1 MP", "4 MP", "12 MP")] * (count // 3)
+    print(f"\nthroughput over {len(images)} mixed images:")
+    for workers in range(1, max_workers + 1):
+        print(f"  {workers} worker(s): {asyncio.run(throughput(images, workers)):.1f} images/s")
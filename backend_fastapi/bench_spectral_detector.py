@@ -0,0 +1,138 @@
+"""
+Benchmark: local spectral AI-image detector.
+Scores a labelled image set and reports accuracy, per-class score ranges and
+time per image (full-resolution crop decode, then features). Without a
+directory, a small deterministic synthetic set is generated: camera-like
+scenes with sensor noise as "real", and noise-free scenes upsampled 2x the
+way generator decoders do (bilinear, nearest, transposed convolution) as
+"ai". The synthetic set checks the artifact measurements, not real-world
+accuracy; point it at real/ and ai/ folders of actual images for that
+(fixtures/spectral has camera photos).
+
+Usage: python bench_spectral_detector.py [DIRECTORY_WITH_real_AND_ai] [--write DIR]
+"""
+import os
+import io
+import sys
+import time
+import argparse
+from typing import List, Tuple
+import numpy as np
+from PIL import Image
+from spectral_detector import detect, native_crop
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def scene(height: int, width: int, rng: np.random.Generator) -> np.ndarray:
+    """1/f noise in three correlated channels plus a few hard-edged shapes, as float RGB in 0-255."""
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(width)[None, :]
+    amplitude = 1 / np.maximum(np.sqrt(fy ** 2 + fx ** 2), 1 / max(height, width)) ** rng.uniform(0.9, 1.1)
+    base = np.fft.irfft2(amplitude * np.exp(2j * np.pi * rng.random(amplitude.shape)), s=(height, width))
+    channels = [base + 0.4 * np.fft.irfft2(amplitude * np.exp(2j * np.pi * rng.random(amplitude.shape)), s=(height, width))
+                for _ in range(3)]
+    image = np.stack(channels, axis=-1)
+    image = (image - image.min()) / (image.max() - image.min()) * 200 + 25
+    for _ in range(6):
+        y, x = rng.integers(0, height - 20), rng.integers(0, width - 20)
+        h, w = rng.integers(10, height // 3), rng.integers(10, width // 3)
+        image[y:y + h, x:x + w] = image[y:y + h, x:x + w] * 0.5 + rng.uniform(20, 230, 3) * 0.5
+    return image
+
+
+def upsample(image: np.ndarray, method: str) -> np.ndarray:
+    height, width = image.shape[:2]
+    if method == "transposed_conv":
+        # Zero insertion followed by a 3x3 kernel whose taps don't sum evenly over the phases: checkerboard
+        up = np.zeros((height * 2, width * 2, 3))
+        up[::2, ::2] = image
+        kernel = np.array([[0.3, 0.6, 0.3], [0.6, 1.0, 0.6], [0.3, 0.6, 0.3]])
+        padded = np.pad(up, ((1, 1), (1, 1), (0, 0)), mode="edge")
+        return sum(kernel[i, j] * padded[i:i + height * 2, j:j + width * 2]
+                   for i in range(3) for j in range(3)) / kernel[::2, ::2].sum()
+    resample = {"bilinear": Image.Resampling.BILINEAR, "nearest": Image.Resampling.NEAREST}[method]
+    channels = [np.asarray(Image.fromarray(image[..., c].astype(np.float32), mode="F")
+                           .resize((width * 2, height * 2), resample)) for c in range(3)]
+    return np.stack(channels, axis=-1)
+
+
+def encode(image: np.ndarray, rng: np.random.Generator) -> bytes:
+    buffer = io.BytesIO()
+    pil = Image.fromarray(np.clip(image, 0, 255).round().astype(np.uint8))
+    if rng.random() < 0.5:
+        pil.save(buffer, format="PNG")
+    else:
+        pil.save(buffer, format="JPEG", quality=int(rng.choice([88, 92, 95])))
+    return buffer.getvalue()
+
+
+def synthetic_set(count: int = 24, seed: int = 7) -> List[Tuple[str, str, bytes]]:
+    rng = np.random.default_rng(seed)
+    items = []
+    for i in range(count):
+        # Camera-like: full-resolution scene with signal-dependent sensor noise
+        image = scene(640, 768, rng)
+        image = image + rng.normal(0, 1, image.shape) * np.sqrt(rng.uniform(1, 6) + image * rng.uniform(0.01, 0.04))
+        items.append(("real", f"real-{i:02d}", encode(image, rng)))
+
+        # Generator-like: clean half-resolution latent decoded 2x
+        method = ["bilinear", "nearest", "transposed_conv"][i % 3]
+        image = upsample(scene(320, 384, rng), method)
+        items.append(("ai", f"ai-{i:02d}-{method}", encode(image, rng)))
+    return items
+
+
+def labelled_set(directory: str) -> List[Tuple[str, str, bytes]]:
+    items = []
+    for label in ("real", "ai"):
+        folder = os.path.join(directory, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(folder, name), "rb") as f:
+                    items.append((label, name, f.read()))
+    return items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("directory", nargs="?", help="Folder with real/ and ai/ subfolders")
+    parser.add_argument("--write", help="Save the synthetic set to this folder as real/ and ai/")
+    args = parser.parse_args()
+
+    items = labelled_set(args.directory) if args.directory else synthetic_set()
+    if args.write:
+        for label, name, data in items:
+            os.makedirs(os.path.join(args.write, label), exist_ok=True)
+            extension = ".png" if data.startswith(b"\x89PNG") else ".jpg"
+            with open(os.path.join(args.write, label, name + extension), "wb") as f:
+                f.write(data)
+
+    scores = {"real": [], "ai": []}
+    decode_ms, feature_ms = [], []
+    print(f"{'image':>24} {'label':>5} {'p(ai)':>6} {'periodic':>9} {'jpeg':>6} {'noise':>6} {'hf':>6}")
+    for label, name, data in items:
+        started = time.perf_counter()
+        gray = native_crop(data)
+        decode_ms.append((time.perf_counter() - started) * 1000)
+        if gray is None:
+            print(f"{name:>24} skipped (too large or too small)")
+            continue
+        result = detect(gray)
+        feature_ms.append(result["elapsed_ms"])
+        scores[label].append(result["ai_probability"])
+        f = result["features"]
+        print(f"{name[:24]:>24} {label:>5} {result['ai_probability']:6.2f} {f['periodic']:9.2f} "
+              f"{f['jpeg_grid']:6.2f} {f['noise']:6.2f} {f['hf_ratio']:6.2f}")
+
+    correct = sum(p < 0.5 for p in scores["real"]) + sum(p >= 0.5 for p in scores["ai"])
+    total = len(scores["real"]) + len(scores["ai"])
+    print(f"\naccuracy at 0.5: {correct}/{total} ({correct / max(total, 1):.0%})")
+    for label, values in scores.items():
+        if values:
+            print(f"{label:>5}: p(ai) min {min(values):.2f}  median {np.median(values):.2f}  max {max(values):.2f}")
+    print(f"crop decode: {np.mean(decode_ms):.1f} ms/image, features: {np.mean(feature_ms):.1f} ms/image "
+          f"(median {np.median(feature_ms):.1f})")
+    sys.exit(0)
@@ -0,0 +1,570 @@
+"""
+Caching Module
+Size-bounded LRU caches with per-entry TTL, in memory or persisted to SQLite,
+plus a stale-while-revalidate cache for async loaders.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from image_index import chunk_variants, split_hash
+from models import Evidence, ScoreResponse
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache"))
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class TTLCache:
+    """
+    In-memory LRU cache. Entries expire after `ttl` seconds and the least
+    recently used entry is evicted once `max_size` is reached.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SQLiteTTLCache(TTLCache):
+    """
+    Same contract as TTLCache, persisted to a SQLite file so entries survive
+    restarts. Values must be JSON serializable.
+    """
+
+    def __init__(self, path: str, max_size: int = 10000, ttl: float = 3600):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now),
+            )
+            overflow = len(self) - self.max_size
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["backend"] = "disk"
+        stats["path"] = self.path
+        return stats
+
+
+def make_cache(backend: str, name: str, max_size: int, ttl: float) -> TTLCache:
+    """Build a memory or disk cache; disk caches live in CACHE_DIR/<name>.db."""
+    if backend == "disk":
+        return SQLiteTTLCache(os.path.join(CACHE_DIR, f"{name}.db"), max_size=max_size, ttl=ttl)
+    return TTLCache(max_size=max_size, ttl=ttl)
+
+
+class VerdictCache:
+    """
+    Persistent cache of ScoreAgent verdicts keyed by a fingerprint of the
+    normalized claim text plus its evidence. A small in-memory tier sits in
+    front of SQLite so repeat lookups skip both the LLM and the disk.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 50000, ttl: float = 7 * 24 * 3600,
+                 memory_size: int = 2048):
+        self.disk = SQLiteTTLCache(path or os.path.join(CACHE_DIR, "verdicts.db"), max_size=max_size, ttl=ttl)
+        self.memory = TTLCache(max_size=memory_size, ttl=ttl)
+
+    @staticmethod
+    def fingerprint(claim_text: str, evidence: List[Evidence]) -> str:
+        # Evidence order depends on which search finished first, so sort it
+        items = sorted((e.url, e.content) for e in evidence)
+        payload = json.dumps([normalize_text(claim_text), items], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, claim_text: str, evidence: List[Evidence]) -> Optional[ScoreResponse]:
+        key = self.fingerprint(claim_text, evidence)
+        score = self.memory.get(key)
+        if score is None:
+            data = self.disk.get(key)
+            if data is None:
+                return None
+            score = ScoreResponse(**data)
+            self.memory.set(key, score)
+        return score.model_copy()
+
+    def set(self, claim_text: str, evidence: List[Evidence], score: ScoreResponse):
+        key = self.fingerprint(claim_text, evidence)
+        # Token usage belongs to the original request, a cache hit costs nothing
+        score = score.model_copy(update={"usage": None})
+        self.memory.set(key, score)
+        self.disk.set(key, score.model_dump())
+
+    def invalidate(self, claim_text: str, evidence: List[Evidence]):
+        key = self.fingerprint(claim_text, evidence)
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> Dict:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+class HttpContentCache:
+    """
+    On-disk cache of extracted page content keyed by URL, with the HTTP
+    validators (ETag, Last-Modified) needed to revalidate it. Eviction is by
+    total stored size, least recently used first. Freshness is decided by the
+    caller, which stores an absolute `expires_at` with each entry.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path or os.path.join(CACHE_DIR, "links.db")
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_links_accessed ON links (accessed_at)")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return {"value", "etag", "last_modified", "expires_at"}, fresh or not."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, etag, last_modified, expires_at FROM links WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE links SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return {"value": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "expires_at": row[3]}
+
+    def set(self, url: str, value: Any, expires_at: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8")) + len(url)
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO links (url, value, etag, last_modified, expires_at, accessed_at, size)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (url, payload, etag, last_modified, expires_at, time.time(), size),
+            )
+            self._evict()
+
+    def revalidated(self, url: str, expires_at: float, etag: Optional[str] = None,
+                    last_modified: Optional[str] = None):
+        """Extend an entry after a 304, keeping validators the server didn't resend."""
+        with self._lock:
+            self._conn.execute(
+                """UPDATE links SET expires_at = ?, accessed_at = ?,
+                       etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                   WHERE url = ?""",
+                (expires_at, time.time(), etag, last_modified, url),
+            )
+
+    def _evict(self):
+        overflow = self._total_bytes() - self.max_bytes
+        if overflow <= 0:
+            return
+        # Drop the shortest least-recently-used prefix that frees `overflow` bytes
+        evicted = self._conn.execute(
+            """DELETE FROM links WHERE url IN (
+                   SELECT url FROM (
+                       SELECT url, size, SUM(size) OVER (ORDER BY accessed_at, url) AS running FROM links
+                   ) WHERE running - size < ?
+               )""",
+            (overflow,),
+        ).rowcount
+        self.evictions += evicted
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM links").fetchone()[0]
+
+    def delete(self, url: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM links WHERE url = ?", (url,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM links")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._total_bytes()
+        return {
+            "backend": "disk",
+            "path": self.path,
+            "size": len(self),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class ImageResultCache:
+    """
+    Persistent LRU cache of image analysis results. Entries are keyed by the
+    SHA-256 of the uploaded bytes; a second tier matches 64-bit perceptual
+    hashes within `max_distance` bits, so re-encoded or resized copies of a
+    known image hit too. Perceptual hashes are mirrored in memory and
+    bucketed per 16-bit chunk, the same multi-index hashing ImageIndex uses,
+    so a near-match lookup checks only the few entries sharing a chunk.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 10000, ttl: float = 7 * 24 * 3600,
+                 max_distance: int = 4):
+        self.path = path or os.path.join(CACHE_DIR, "images.db")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS images (
+                sha256 TEXT PRIMARY KEY,
+                phash INTEGER,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_accessed ON images (accessed_at)")
+        self._conn.execute("DELETE FROM images WHERE expires_at < ?", (time.time(),))
+        # sha256 -> unsigned perceptual hash, and per chunk position: chunk value -> sha256s
+        self._phashes: Dict[str, int] = {}
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in split_hash(0)]
+        for sha, phash in self._conn.execute("SELECT sha256, phash FROM images WHERE phash IS NOT NULL"):
+            self._index(sha, _from_signed64(phash))
+
+    def get(self, sha256: str) -> Optional[Any]:
+        """Exact lookup by content hash; counts a miss only via get_similar."""
+        value = self._read(sha256)
+        if value is not None:
+            self.exact_hits += 1
+        return value
+
+    def get_similar(self, phash: int) -> Optional[Tuple[Any, int]]:
+        """Closest entry within max_distance bits of `phash`, as (value, distance)."""
+        variants = chunk_variants(phash, self.max_distance)
+        with self._lock:
+            candidates = set()
+            for bucket, values in zip(self._buckets, variants):
+                for value in values:
+                    candidates.update(bucket.get(value, ()))
+            best, best_distance = None, self.max_distance + 1
+            for sha in candidates:
+                distance = bin(phash ^ self._phashes[sha]).count("1")
+                if distance < best_distance:
+                    best, best_distance = sha, distance
+                    if not distance:
+                        break
+        value = self._read(best) if best else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.perceptual_hits += 1
+        return value, best_distance
+
+    def _index(self, sha256: str, phash: int):
+        self._unindex(sha256)
+        self._phashes[sha256] = phash
+        for bucket, chunk in zip(self._buckets, split_hash(phash)):
+            bucket.setdefault(chunk, set()).add(sha256)
+
+    def _unindex(self, sha256: str):
+        phash = self._phashes.pop(sha256, None)
+        if phash is None:
+            return
+        for bucket, chunk in zip(self._buckets, split_hash(phash)):
+            shas = bucket[chunk]
+            shas.discard(sha256)
+            if not shas:
+                del bucket[chunk]
+
+    def _read(self, sha256: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM images WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM images WHERE sha256 = ?", (sha256,))
+                self._unindex(sha256)
+                return None
+            self._conn.execute("UPDATE images SET accessed_at = ? WHERE sha256 = ?", (now, sha256))
+        return json.loads(row[0])
+
+    def set(self, sha256: str, phash: Optional[int], value: Any):
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (sha256, phash, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, None if phash is None else _to_signed64(phash), payload, now + self.ttl, now),
+            )
+            if phash is not None:
+                self._index(sha256, phash)
+            else:
+                self._unindex(sha256)
+            overflow = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0] - self.max_size
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "SELECT sha256 FROM images ORDER BY accessed_at LIMIT ?", (overflow,)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM images WHERE sha256 = ?", evicted)
+                for (sha,) in evicted:
+                    self._unindex(sha)
+                self.evictions += len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM images")
+            self._phashes.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "disk",
+            "path": self.path,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "max_distance": self.max_distance,
+            "exact_hits": self.exact_hits,
+            "perceptual_hits": self.perceptual_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _to_signed64(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class StaleWhileRevalidateCache:
+    """
+    Per-key cache for async loaders with stale-while-revalidate semantics.
+    Entries younger than `ttl` are served as is. Entries up to `ttl + stale_ttl`
+    old are served immediately while a single background refresh runs. Older
+    or missing entries are loaded inline, with concurrent callers sharing one
+    load per key.
+    """
+
+    def __init__(self, ttl: float = 300, stale_ttl: float = 3600):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self._entries: Dict[str, tuple] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, float, str]:
+        """Return (value, age in seconds, "fresh" | "stale" | "miss")."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return value, age, "fresh"
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._start_refresh(key, loader)
+                return value, age, "stale"
+
+        self.misses += 1
+        value = await self.refresh(key, loader)
+        return value, 0.0, "miss"
+
+    async def refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Load `key` now, joining a refresh that is already running for it."""
+        return await asyncio.shield(self._start_refresh(key, loader))
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (value, time.time())
+
+    def age(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return time.time() - entry[1] if entry else None
+
+    def _start_refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            # Background refreshes may fail with nobody awaiting them; mark the error as seen
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        except Exception as e:
+            self.refresh_failures += 1
+            print(f"ERROR: Cache refresh failed for {key}: {e}")
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "keys": len(self._entries),
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshing": len(self._inflight),
+            "refresh_failures": self.refresh_failures,
+        }
@@ -0,0 +1,184 @@
+"""
+Claim Storage Module
+Bounded, persistent claim store backed by SQLite in WAL mode. Replaces the
+unbounded in-process claim list so memory stays flat, claims survive
+restarts and every worker reads the same data.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from models import Claim
+
+CLAIM_DB_PATH = os.getenv("CLAIM_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "claims.db"))
+# Retention: claims older than this many days, or beyond the newest CLAIM_MAX_ROWS, are compacted away
+CLAIM_RETENTION_DAYS = float(os.getenv("CLAIM_RETENTION_DAYS", "30"))
+CLAIM_MAX_ROWS = int(os.getenv("CLAIM_MAX_ROWS", "100000"))
+# Run compaction after this many inserted claims
+CLAIM_COMPACT_EVERY = int(os.getenv("CLAIM_COMPACT_EVERY", "500"))
+
+
+class ClaimStore:
+    def __init__(self, path: str = CLAIM_DB_PATH, retention_days: float = CLAIM_RETENTION_DAYS,
+                 max_rows: int = CLAIM_MAX_ROWS, compact_every: int = CLAIM_COMPACT_EVERY):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.compact_every = compact_every
+        self._inserts_since_compact = 0
+        self._lock = threading.Lock()
+        # Called with the ids compaction removed, so derived indexes can drop them too
+        self.on_evict: Optional[Callable[[List[str]], None]] = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS claims (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL,
+                source TEXT,
+                timestamp REAL NOT NULL,
+                data TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_source ON claims (source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_timestamp ON claims (timestamp)")
+
+    def _row(self, claim: Claim) -> tuple:
+        if not claim.id:
+            claim.id = str(uuid.uuid4())
+        return (claim.id, claim.status, claim.source, claim.timestamp.timestamp(), claim.model_dump_json())
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        # One shared connection: serialize reads with writes so nobody sees a half-done batch
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add(self, claim: Claim) -> Claim:
+        """Insert a claim, or replace the stored copy if its id already exists."""
+        self.add_many([claim])
+        return claim
+
+    def add_many(self, claims: List[Claim]):
+        """Insert or update claims in a single transaction."""
+        if not claims:
+            return
+        rows = [self._row(claim) for claim in claims]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Upsert keeps a claim's seq stable when it is updated in place
+                self._conn.executemany(
+                    """INSERT INTO claims (id, status, source, timestamp, data) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(id) DO UPDATE SET
+                           status = excluded.status, source = excluded.source,
+                           timestamp = excluded.timestamp, data = excluded.data""",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._inserts_since_compact += len(rows)
+            due = self._inserts_since_compact >= self.compact_every
+        if due:
+            self.compact()
+
+    def get(self, claim_id: str) -> Optional[Claim]:
+        rows = self._query("SELECT data FROM claims WHERE id = ?", (claim_id,))
+        return Claim.model_validate_json(rows[0][0]) if rows else None
+
+    def recent(self, limit: int = 100) -> List[Claim]:
+        """Newest claims, returned oldest first."""
+        rows = self._query("SELECT data FROM claims ORDER BY seq DESC LIMIT ?", (limit,))
+        return [Claim.model_validate_json(row[0]) for row in reversed(rows)]
+
+    def page(self, after: int = 0, limit: int = 100, status: Optional[str] = None,
+             source: Optional[str] = None) -> List[Tuple[int, str]]:
+        """
+        Keyset page of (seq, claim JSON) rows with seq > `after`, oldest first.
+        Rows are returned as stored so callers can stream them without re-validating.
+        """
+        sql = "SELECT seq, data FROM claims WHERE seq > ?"
+        params: list = [after]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def iter_rows(self, after: int = 0, status: Optional[str] = None, source: Optional[str] = None,
+                  limit: Optional[int] = None, chunk_size: int = 500) -> Iterator[Tuple[int, str]]:
+        """Walk matching rows page by page so only one chunk is in memory at a time."""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            rows = self.page(after=after, limit=size, status=status, source=source)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def last_seq(self) -> int:
+        """Position of the newest claim; every later claim gets a higher seq."""
+        return self._query("SELECT COALESCE(MAX(seq), 0) FROM claims")[0][0]
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status:
+            return self._query("SELECT COUNT(*) FROM claims WHERE status = ?", (status,))[0][0]
+        return self._query("SELECT COUNT(*) FROM claims")[0][0]
+
+    def compact(self) -> Dict:
+        """Apply the retention policies and give freed pages back to the WAL checkpoint."""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        started = time.time()
+        evicted: List[str] = []
+        with self._lock:
+            for where, params in (
+                ("timestamp < ?", (cutoff,)),
+                ("seq <= (SELECT seq FROM claims ORDER BY seq DESC LIMIT 1 OFFSET ?)", (self.max_rows,)),
+            ):
+                ids = [row[0] for row in self._conn.execute(f"SELECT id FROM claims WHERE {where}", params)]
+                if ids:
+                    self._conn.execute(f"DELETE FROM claims WHERE {where}", params)
+                evicted.append(ids)
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._inserts_since_compact = 0
+        expired, overflow = (len(ids) for ids in evicted)
+        if expired or overflow:
+            print(f"Claim store compacted: {expired} expired, {overflow} over limit "
+                  f"({(time.time() - started) * 1000:.1f} ms)")
+            if self.on_evict:
+                self.on_evict(evicted[0] + evicted[1])
+        return {"expired": expired, "overflow": overflow}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM claims")
+
+    def stats(self) -> Dict:
+        rows = self._query("SELECT status, COUNT(*) FROM claims GROUP BY status")
+        return {
+            "path": self.path,
+            "total": sum(count for _, count in rows),
+            "by_status": dict(rows),
+            "max_rows": self.max_rows,
+            "retention_days": self.retention_days,
+        }
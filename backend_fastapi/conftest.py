@@ -0,0 +1,15 @@
+"""
+Shared pytest setup. Every store points at a throwaway directory and the
+news prefetcher stays off, so importing `main` in a test neither touches
+data/ nor starts background scans.
+"""
+import os
+import tempfile
+
+_STATE_DIR = tempfile.mkdtemp(prefix="cruxai-tests-")
+os.environ["CACHE_DIR"] = _STATE_DIR
+os.environ["CLAIM_DB_PATH"] = os.path.join(_STATE_DIR, "claims.db")
+os.environ["IMAGE_INDEX_PATH"] = os.path.join(_STATE_DIR, "image_index.db")
+os.environ["NEWS_PREFETCH_ENABLED"] = "false"
+os.environ.setdefault("SEARCH_TIMEOUT", "2")
+os.environ.setdefault("LINK_FETCH_TIMEOUT", "2")
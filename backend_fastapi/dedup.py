@@ -0,0 +1,128 @@
+"""
+Near-Duplicate Detection Module
+MinHash signatures with LSH banding over normalized headlines, so syndicated
+copies of a story collapse into one canonical claim. Shingles are word
+pairs and the threshold is high: headlines that differ in who, where, how
+many or which way ("Biden wins..." / "Trump wins...", "Stocks rise..." /
+"Stocks fall...") are different stories and must stay apart.
+"""
+import os
+import re
+import zlib
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_MAX_CLUSTERS = int(os.getenv("DEDUP_MAX_CLUSTERS", "20000"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Titles shorter than this many words borrow the start of the description
+_SHORT_TITLE_WORDS = 6
+
+
+def normalize_headline(title: str, description: str = "") -> str:
+    """Lowercase, strip punctuation and trailing "- Source" tags from a headline."""
+    title = re.sub(r"\s+[-|–]\s+[^-|–]{1,40}$", "", title.strip())
+    text = title
+    if len(title.split()) < _SHORT_TITLE_WORDS and description:
+        text = f"{title} {description[:160]}"
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def shingles(text: str, size: int = 2) -> Set[int]:
+    """Word n-gram shingles, hashed to 32-bit ints."""
+    words = text.split()
+    if len(words) <= size:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+class HeadlineClusterer:
+    """
+    Assigns headlines to clusters of near-duplicates. A headline joins an
+    existing cluster when its estimated Jaccard similarity to the cluster's
+    canonical headline reaches `threshold`; candidates come from LSH buckets,
+    so lookups don't compare against every cluster. The oldest clusters are
+    forgotten once `max_clusters` is reached.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = 64, bands: int = 16,
+                 max_clusters: int = DEDUP_MAX_CLUSTERS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_clusters = max_clusters
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._signatures: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._lock = threading.Lock()
+        self.merged = 0
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = shingles(text)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
+
+    def find(self, text: str) -> Optional[str]:
+        """Key of the most similar known cluster above the threshold, if any."""
+        signature = self.signature(text)
+        with self._lock:
+            return self._find(signature)
+
+    def _find(self, signature: Tuple[int, ...]) -> Optional[str]:
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates |= self._buckets.get(bucket, set())
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = self.similarity(signature, self._signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def assign(self, text: str, key: str) -> Optional[str]:
+        """
+        Return the key of the cluster `text` belongs to, or register it as a
+        new cluster under `key` and return None.
+        """
+        signature = self.signature(text)
+        with self._lock:
+            existing = self._find(signature)
+            if existing is not None:
+                self.merged += 1
+                self._signatures.move_to_end(existing)
+                return existing
+            self._signatures[key] = signature
+            for bucket in self._bands(signature):
+                self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._signatures) > self.max_clusters:
+                self._forget(*self._signatures.popitem(last=False))
+        return None
+
+    def _forget(self, key: str, signature: Tuple[int, ...]):
+        for bucket in self._bands(signature):
+            members = self._buckets.get(bucket)
+            if members:
+                members.discard(key)
+                if not members:
+                    del self._buckets[bucket]
+
+    def stats(self) -> Dict:
+        return {"clusters": len(self._signatures), "merged": self.merged, "threshold": self.threshold}
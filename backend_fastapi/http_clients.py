@@ -0,0 +1,223 @@
+"""
+HTTP Client Registry
+One set of long-lived, pooled HTTP clients for every outbound call: user links
+(httpx), NewsData (requests), DuckDuckGo (primp, via DDGS) and Hugging Face
+inference (httpx). Opened once in the app lifespan and injected into the
+agents, so repeat calls to the same upstream reuse kept-alive connections
+instead of paying for a new TCP/TLS handshake each time.
+"""
+import os
+import asyncio
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from duckduckgo_search import DDGS
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_MAX_HOSTS = int(os.getenv("HTTP_MAX_HOSTS", "256"))
+
+
+class _HostSemaphore(asyncio.Semaphore):
+    """Per-host semaphore that counts the requests holding or waiting for a slot."""
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self.users = 0
+
+    async def acquire(self):
+        self.users += 1
+        try:
+            return await super().acquire()
+        except BaseException:
+            self.users -= 1
+            raise
+
+    def release(self):
+        self.users -= 1
+        super().release()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that gives its host slot back once it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: _HostSemaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Caps concurrent requests per host on top of httpx's global pool limit,
+    so one slow site can't take every connection. A slot is held until the
+    response body is closed. Only the max_hosts most recently used hosts
+    keep a semaphore, since user links can point anywhere. A semaphore is
+    only dropped while no request holds or waits for it; dropping a busy one
+    would let its host run a fresh set of requests next to the old ones.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int = HTTP_MAX_PER_HOST,
+                 max_hosts: int = HTTP_MAX_HOSTS):
+        self._transport = transport
+        self.max_per_host = max_per_host
+        self.max_hosts = max_hosts
+        self._semaphores: "OrderedDict[bytes, _HostSemaphore]" = OrderedDict()
+
+    def _semaphore(self, host: bytes) -> _HostSemaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = _HostSemaphore(self.max_per_host)
+            overflow = len(self._semaphores) - self.max_hosts
+            if overflow > 0:
+                # Least recently used idle hosts go first; while every host is busy
+                # the table stays over max_hosts until their requests finish
+                idle = (name for name, held in self._semaphores.items() if not held.users and name != host)
+                for name in list(islice(idle, overflow)):
+                    del self._semaphores[name]
+        else:
+            self._semaphores.move_to_end(host)
+        return semaphore
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore = self._semaphore(request.url.netloc)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class SharedSession(requests.Session):
+    """
+    requests.Session handed to third-party clients. NewsDataApiClient closes
+    its session when garbage collected, which would drop our pools after
+    every call, so close() is a no-op and only the registry shuts it down.
+    """
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+class HttpClients:
+    """
+    Registry of shared clients. Agents hold a reference and fall back to
+    one-off clients while it is closed (scripts, tests, before startup).
+    """
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 max_per_host: int = HTTP_MAX_PER_HOST, keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self.async_client: Optional[httpx.AsyncClient] = None
+        self.session: Optional[SharedSession] = None
+        self._local = threading.local()
+
+    @property
+    def is_open(self) -> bool:
+        return self.async_client is not None
+
+    def _limits(self, max_connections: int) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def open(self):
+        if self.is_open:
+            return
+        transport = httpx.AsyncHTTPTransport(limits=self._limits(self.max_connections), retries=1)
+        self.async_client = httpx.AsyncClient(
+            transport=HostLimitedTransport(transport, self.max_per_host),
+            timeout=self.timeout,
+            follow_redirects=True,
+        )
+
+        # urllib3 keeps one pool per host; pool_maxsize is the per-host cap
+        self.session = SharedSession()
+        adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_per_host)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._configure_huggingface()
+
+    def _configure_huggingface(self):
+        # huggingface_hub >= 1.0 routes InferenceClient calls through one
+        # process-wide httpx.Client; size and time out that pool like ours.
+        # The hook is internal to the hub, so go without it if it moves.
+        try:
+            import huggingface_hub
+        except ImportError:
+            return
+        try:
+            from huggingface_hub.utils._http import hf_request_event_hook
+        except ImportError:
+            hf_request_event_hook = None
+        if hf_request_event_hook is None or not hasattr(huggingface_hub, "set_client_factory"):
+            print("WARNING: huggingface_hub has no client factory hook; Hugging Face calls use its default HTTP pool")
+            return
+        limits = self._limits(self.max_per_host)
+        huggingface_hub.set_client_factory(lambda: httpx.Client(
+            event_hooks={"request": [hf_request_event_hook]},
+            follow_redirects=True,
+            timeout=httpx.Timeout(self.timeout, write=60.0),
+            limits=limits,
+        ))
+
+    def ddgs(self) -> DDGS:
+        """
+        DuckDuckGo client for the calling thread. DDGS holds its own
+        connection pool and cookies, so each worker thread keeps one.
+        """
+        ddgs = getattr(self._local, "ddgs", None)
+        if ddgs is None:
+            ddgs = DDGS(timeout=int(self.timeout))
+            self._local.ddgs = ddgs
+        return ddgs
+
+    async def aclose(self):
+        if self.async_client:
+            await self.async_client.aclose()
+            self.async_client = None
+        if self.session:
+            self.session.shutdown()
+            self.session = None
+
+    def stats(self) -> Dict:
+        return {
+            "open": self.is_open,
+            "timeout": self.timeout,
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host,
+            "keepalive_expiry": self.keepalive_expiry,
+        }
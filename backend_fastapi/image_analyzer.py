@@ -4,39 +4,161 @@ Provides AI-generated image detection and reverse image search capabilities.
 """
 import os
 import io
+import time
 import base64
-from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import threading
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 from PIL import Image
-import requests
 from huggingface_hub import InferenceClient
+from cache import ImageResultCache
+from image_index import ImageIndex, perceptual_hash
+from forensics import generator_signature
+import spectral_detector
 
 # Load API keys
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+# Per-call limit (seconds) for each Hugging Face inference request
+HF_INFERENCE_TIMEOUT = float(os.getenv("HF_INFERENCE_TIMEOUT", "20"))
+
+# Analysis results cache, keyed by content hash with a perceptual-hash fallback
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "10000"))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "604800"))
+# Max differing bits (of 64) for two images to count as the same picture
+IMAGE_PHASH_MAX_DISTANCE = int(os.getenv("IMAGE_PHASH_MAX_DISTANCE", "4"))
+# Images are shrunk to this longest side and re-encoded before going to the
+# models, which resize to 224-384px internally anyway
+IMAGE_MODEL_MAX_SIDE = int(os.getenv("IMAGE_MODEL_MAX_SIDE", "512"))
+IMAGE_MODEL_QUALITY = int(os.getenv("IMAGE_MODEL_QUALITY", "90"))
+# Every analyzed image is recorded in the local reverse-search index
+REVERSE_SEARCH_ENABLED = os.getenv("REVERSE_SEARCH_ENABLED", "true").lower() == "true"
+# Where AI detection runs: "remote" (Hugging Face, local spectral detector as fallback),
+# "local" (spectral detector only, no network) or "prefilter" (local first, remote only
+# unless the local score reaches AI_PREFILTER_THRESHOLD). Upscaled photos carry the same
+# periodic traces as generator output, so those never count toward the threshold; without
+# them the spectral score stays near 25%, and in practice only generator metadata skips
+# the remote model.
+AI_DETECTION_MODE = os.getenv("AI_DETECTION_MODE", "remote").lower()
+AI_PREFILTER_THRESHOLD = float(os.getenv("AI_PREFILTER_THRESHOLD", "0.9"))
+SPECTRAL_MODEL = "spectral_local"
+# Results from these never reach the cache, so a viral image isn't pinned to a fallback
+# or to the local heuristic
+FALLBACK_MODELS = ("fallback_spectral", "fallback_heuristic", "fallback_basic", "error", SPECTRAL_MODEL)
+# Images of one batch request read, decoded and sent to the models at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Spooled uploads are one file object; only one thread re-reads it at a time
+_source_lock = threading.Lock()
+
+
+class DecodedImage(NamedTuple):
+    """
+    An upload decoded once and shared by every analysis step. `image` is a
+    working copy no larger than IMAGE_MODEL_MAX_SIDE; the original
+    dimensions, format and EXIF are kept alongside it.
+    """
+    model_input: bytes  # Downscaled JPEG sent to the inference models
+    image: Optional[Image.Image]
+    width: int = 0
+    height: int = 0
+    format: Optional[str] = None
+    mode: Optional[str] = None
+    exif: Optional[Image.Exif] = None
+    error: Optional[str] = None
+    phash: Optional[int] = None
+    source: Union[bytes, BinaryIO, None] = None  # The upload itself, for full-resolution re-reads
+
+
+def content_hash(source: Union[bytes, BinaryIO]) -> str:
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(1 << 16), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def prepare_model_input(image: Image.Image, quality: int = IMAGE_MODEL_QUALITY) -> bytes:
+    """Re-encode the working copy as a compact JPEG for upload to the models."""
+    rgb = image if image.mode == "RGB" else image.convert("RGB")
+    buffer = io.BytesIO()
+    rgb.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def decode_image(source: Union[bytes, BinaryIO], max_side: int = IMAGE_MODEL_MAX_SIDE) -> DecodedImage:
+    """
+    Decode an image from bytes or a file once, straight down to `max_side`.
+    A failure is kept on the result for the fallbacks to report.
+    """
+    try:
+        image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        width, height = image.size
+        format_type, mode = image.format, image.mode
+        exif = image.getexif()
+        # thumbnail() lets JPEG decode at 1/2-1/8 scale, so a 24 MP photo is never fully expanded
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        return DecodedImage(
+            prepare_model_input(image), image, width, height, format_type, mode, exif,
+            phash=perceptual_hash(image), source=source,
+        )
+    except Exception as e:
+        return DecodedImage(b"", None, error=str(e))
+
+
+def decode_detached(data: bytes) -> DecodedImage:
+    """decode_image for worker processes: the caller keeps the bytes, so they aren't sent back."""
+    return decode_image(data)._replace(source=None)
+
+
+# Async stand-in for decode_image, given the upload's bytes
+Decoder = Callable[[bytes], Awaitable[DecodedImage]]
+
 
 class ImageAnalyzer:
     def __init__(self):
         self.hf_client = None
         if HUGGINGFACE_API_KEY:
-            self.hf_client = InferenceClient(token=HUGGINGFACE_API_KEY)
+            # The client-side timeout stops calls we've already given up on
+            self.hf_client = InferenceClient(token=HUGGINGFACE_API_KEY, timeout=HF_INFERENCE_TIMEOUT)
             print("✓ Hugging Face client initialized")
         else:
             print("WARNING: HUGGINGFACE_API_KEY not set. AI detection will use fallback.")
+        # Viral images are uploaded over and over; reuse their model results
+        self.cache = ImageResultCache(
+            max_size=IMAGE_CACHE_SIZE, ttl=IMAGE_CACHE_TTL, max_distance=IMAGE_PHASH_MAX_DISTANCE
+        ) if IMAGE_CACHE_ENABLED else None
+        self.index = ImageIndex() if REVERSE_SEARCH_ENABLED else None
     
-    def detect_ai_generated(self, image_data: bytes) -> Dict:
+    def _decoded(self, image: Union[bytes, DecodedImage]) -> DecodedImage:
+        return image if isinstance(image, DecodedImage) else decode_image(image)
+
+    def detect_ai_generated(self, image: Union[bytes, DecodedImage]) -> Dict:
         """
         Detect if an image is AI-generated using Hugging Face models.
         Returns probability and confidence score.
         """
+        decoded = self._decoded(image)
         try:
+            if AI_DETECTION_MODE == "local":
+                return self._local_ai_detection(decoded, SPECTRAL_MODEL) or self._fallback_ai_detection(decoded)
+            if AI_DETECTION_MODE == "prefilter":
+                local = self._local_ai_detection(decoded, SPECTRAL_MODEL)
+                if local and local["without_resampling"] >= AI_PREFILTER_THRESHOLD * 100:
+                    return local
             if not self.hf_client:
-                return self._fallback_ai_detection(image_data)
+                return self._fallback_ai_detection(decoded)
             
             print("Analyzing image with Hugging Face AI detector...")
             
             # Use Hugging Face's AI image detection model
             # Model: umm-maybe/AI-image-detector or similar
             result = self.hf_client.image_classification(
-                image=image_data,
+                image=decoded.model_input,
                 model="umm-maybe/AI-image-detector"
             )
             
@@ -75,27 +197,28 @@ class ImageAnalyzer:
                 "verdict": verdict,
                 "confidence": confidence,
                 "model": "umm-maybe/AI-image-detector",
-                "details": result
+                "details": [{"label": item['label'], "score": item['score']} for item in result]
             }
             
         except Exception as e:
             print(f"ERROR in AI detection: {e}")
-            return self._fallback_ai_detection(image_data)
+            return self._fallback_ai_detection(decoded)
     
-    def describe_image(self, image_data: bytes) -> Dict:
+    def describe_image(self, image: Union[bytes, DecodedImage]) -> Dict:
         """
         Generate a detailed description of the image using Hugging Face vision models.
         """
+        decoded = self._decoded(image)
         try:
             if not self.hf_client:
-                return self._fallback_description(image_data)
+                return self._fallback_description(decoded)
             
             print("Generating image description with Hugging Face...")
             
             # Use Hugging Face's image-to-text model
             # Model: Salesforce/blip-image-captioning-large or similar
             result = self.hf_client.image_to_text(
-                image=image_data,
+                image=decoded.model_input,
                 model="Salesforce/blip-image-captioning-large"
             )
             
@@ -112,16 +235,17 @@ class ImageAnalyzer:
             
         except Exception as e:
             print(f"ERROR in image description: {e}")
-            return self._fallback_description(image_data)
+            return self._fallback_description(decoded)
     
-    def _fallback_description(self, image_data: bytes) -> Dict:
+    def _fallback_description(self, decoded: DecodedImage) -> Dict:
         """
         Fallback image description when Hugging Face API unavailable.
         """
         try:
-            image = Image.open(io.BytesIO(image_data))
-            width, height = image.size
-            format_type = image.format
+            if decoded.image is None:
+                raise ValueError(decoded.error)
+            width, height = decoded.width, decoded.height
+            format_type = decoded.format
             
             description = f"An image in {format_type} format with dimensions {width}x{height} pixels."
             
@@ -137,21 +261,81 @@ class ImageAnalyzer:
                 "confidence": "None"
             }
     
-    def _fallback_ai_detection(self, image_data: bytes) -> Dict:
+    def _local_ai_detection(self, decoded: DecodedImage, model: str) -> Optional[Dict]:
+        """
+        Generator metadata when the file carries it, otherwise the local
+        spectral detector's score of a full-resolution crop. None when there
+        is neither (no metadata, and the image too large, too small or unreadable).
+        """
+        generator = generator_signature(decoded.image, decoded.exif) if decoded.image is not None else None
+        if generator:
+            print(f"Local AI detection: generator metadata ({generator})")
+            # Written by the generator itself, so it holds whatever the pixels have been through
+            return {
+                "ai_probability": 99.0,
+                "real_probability": 1.0,
+                "verdict": "AI-Generated (Generator Metadata)",
+                "confidence": "High",
+                "model": model,
+                "details": {"generator": generator},
+                "without_resampling": 99.0,
+            }
+        try:
+            if decoded.source is None:
+                return None
+            if isinstance(decoded.source, (bytes, bytearray)):
+                crop = spectral_detector.native_crop(decoded.source)
+            else:
+                with _source_lock:
+                    crop = spectral_detector.native_crop(decoded.source)
+            if crop is None:
+                return None
+            result = spectral_detector.detect(crop)
+        except Exception as e:
+            print(f"ERROR in spectral detection: {e}")
+            return None
+
+        ai_probability = result["ai_probability"] * 100
+        if ai_probability > 70 and result["without_resampling"] * 100 <= 40:
+            # Only the periodic traces point to a generator, and plain upscaling leaves those too
+            verdict = "Possibly AI-Generated or Upscaled (Local Analysis)"
+        elif ai_probability > 70:
+            verdict = "Possibly AI-Generated (Local Analysis)"
+        elif ai_probability > 40:
+            verdict = "Uncertain (Local Analysis)"
+        else:
+            verdict = "No Generator Artifacts Found (Local Analysis)"
+        print(f"Spectral AI detection: {verdict} ({ai_probability:.1f}%, {result['elapsed_ms']:.0f}ms)")
+        
+        return {
+            "ai_probability": round(ai_probability, 2),
+            "real_probability": round(100 - ai_probability, 2),
+            "verdict": verdict,
+            # Upsampling traces are strong evidence when present; their absence proves little
+            "confidence": "Medium" if ai_probability >= 90 else "Low",
+            "model": model,
+            "details": result["features"],
+            "without_resampling": round(result["without_resampling"] * 100, 2),
+        }
+
+    def _fallback_ai_detection(self, decoded: DecodedImage) -> Dict:
         """
-        Fallback AI detection using image properties analysis.
-        Used when Hugging Face API is unavailable.
+        Fallback AI detection, used when Hugging Face API is unavailable.
+        Tries the local spectral detector, then image properties analysis.
         """
+        local = self._local_ai_detection(decoded, "fallback_spectral")
+        if local:
+            return local
         try:
             print("Using fallback AI detection (analyzing image properties)...")
             
-            # Open image
-            image = Image.open(io.BytesIO(image_data))
+            if decoded.image is None:
+                raise ValueError(decoded.error)
             
-            # Analyze properties
-            width, height = image.size
-            format_type = image.format
-            mode = image.mode
+            # Analyze properties of the original upload
+            width, height = decoded.width, decoded.height
+            format_type = decoded.format
+            mode = decoded.mode
             
             # Simple heuristics (not accurate, just for fallback)
             score = 50.0  # Start neutral
@@ -204,57 +388,64 @@ class ImageAnalyzer:
                 "details": {"error": str(e)}
             }
     
-    def reverse_image_search(self, image_data: bytes) -> List[Dict]:
+    def reverse_image_search(self, phash: Optional[int], sha256: Optional[str] = None,
+                             claim_id: Optional[str] = None) -> Tuple[List[Dict], Dict]:
         """
-        Perform reverse image search to find sources.
-        Uses Google Images search.
+        Look the image up in the local perceptual-hash index, then record this
+        sighting. Returns the earlier copies (closest first) and a provenance
+        summary: seen before, earliest sighting, which claims used it.
         """
+        if self.index is None or phash is None:
+            return [], {"seen_before": False, "earliest_sighting": None, "claim_ids": [], "copies": 0}
         try:
             print("Performing reverse image search...")
-            
-            # For now, return mock results
-            # Real implementation would use SerpAPI or Google Custom Search
-            # Or scrape Google Images (less reliable)
-            
-            return [
-                {
-                    "title": "Reverse image search feature",
-                    "url": "https://images.google.com/",
-                    "source": "Google Images",
-                    "snippet": "Upload your image to Google Images to find similar images and sources."
-                },
-                {
-                    "title": "TinEye Reverse Image Search",
-                    "url": "https://tineye.com/",
-                    "source": "TinEye",
-                    "snippet": "TinEye is a reverse image search engine that helps you find where an image came from."
-                }
-            ]
-            
+            matches = self.index.search(phash)
+            provenance = self.index.provenance(matches)
+            if sha256:
+                self.index.add(phash, sha256, claim_id=claim_id)
         except Exception as e:
             print(f"ERROR in reverse image search: {e}")
-            return []
+            return [], {"seen_before": False, "earliest_sighting": None, "claim_ids": [], "copies": 0, "error": str(e)}
+
+        results = []
+        for match in matches:
+            first_seen = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(match["first_seen"]))
+            snippet = f"First seen {first_seen}, {match['sightings']} sighting(s)"
+            if match["claim_ids"]:
+                snippet += f", used in {len(match['claim_ids'])} earlier claim(s)"
+            results.append({
+                "title": match["title"] or ("Identical image" if match["distance"] == 0 else "Near-identical image"),
+                "url": match["url"],
+                "source": match["source"] or "Local image index",
+                "snippet": snippet,
+                "distance": match["distance"],
+                "first_seen": match["first_seen"],
+                "claim_ids": match["claim_ids"],
+            })
+        return results, provenance
     
-    def extract_metadata(self, image_data: bytes) -> Dict:
+    def extract_metadata(self, image: Union[bytes, DecodedImage]) -> Dict:
         """
         Extract EXIF metadata from image.
         """
+        decoded = self._decoded(image)
         try:
             print("Extracting image metadata...")
             
-            image = Image.open(io.BytesIO(image_data))
+            if decoded.image is None:
+                raise ValueError(decoded.error)
             
             # Basic info
             metadata = {
-                "format": image.format,
-                "mode": image.mode,
-                "size": f"{image.size[0]}x{image.size[1]}",
-                "width": image.size[0],
-                "height": image.size[1],
+                "format": decoded.format,
+                "mode": decoded.mode,
+                "size": f"{decoded.width}x{decoded.height}",
+                "width": decoded.width,
+                "height": decoded.height,
             }
             
             # Try to get EXIF data
-            exif_data = image.getexif()
+            exif_data = decoded.exif
             if exif_data:
                 # Add some common EXIF tags
                 metadata["has_exif"] = True
@@ -269,28 +460,132 @@ class ImageAnalyzer:
             print(f"ERROR extracting metadata: {e}")
             return {"error": str(e)}
     
-    def analyze_image(self, image_data: bytes) -> Dict:
+    def analyze_image(self, image_data: Union[bytes, BinaryIO], sha256: Optional[str] = None,
+                      claim_id: Optional[str] = None) -> Dict:
+        """Blocking wrapper around aanalyze_image for sync callers."""
+        return asyncio.run(self.aanalyze_image(image_data, sha256, claim_id))
+
+    async def aanalyze_image(self, image_data: Union[bytes, BinaryIO], sha256: Optional[str] = None,
+                             claim_id: Optional[str] = None, decoder: Optional[Decoder] = None) -> Dict:
         """
         Perform complete image analysis.
         Combines AI detection, reverse search, and metadata extraction.
+        The image is decoded once, and the remote model calls run side by side
+        with a timeout each, so total latency is roughly the slowest call.
+        Reverse search runs on every call, cached or not, since each upload
+        is a new sighting; `claim_id` links this sighting to its claim.
+        `decoder` replaces the default in-thread decode_image, e.g. to decode
+        in a worker process.
         """
         print("=" * 50)
         print("Starting comprehensive image analysis...")
         print("=" * 50)
-        
+        started = time.perf_counter()
+
+        # Streamed uploads arrive with their hash already computed
+        if sha256 is None:
+            sha256 = await asyncio.to_thread(content_hash, image_data)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, sha256)
+            if cached is not None:
+                phash = int(cached["phash"], 16) if cached.get("phash") else None
+                await self._reverse_search(cached, phash, sha256, claim_id)
+                print(f"Image cache hit (sha256) in {time.perf_counter() - started:.3f}s")
+                cached["cache"] = {"hit": True, "tier": "sha256", "distance": 0}
+                return cached
+
+        if decoder is None:
+            decoded = await asyncio.to_thread(decode_image, image_data)
+        else:
+            decoded = (await decoder(image_data))._replace(source=image_data)
+
+        if self.cache is not None and decoded.phash is not None:
+            similar = await asyncio.to_thread(self.cache.get_similar, decoded.phash)
+            if similar is not None:
+                results, distance = similar
+                # Same picture, different file: model results carry over, file metadata doesn't
+                results["metadata"] = self.extract_metadata(decoded)
+                results["phash"] = f"{decoded.phash:016x}"
+                await self._reverse_search(results, decoded.phash, sha256, claim_id)
+                results["cache"] = {"hit": True, "tier": "phash", "distance": distance}
+                print(f"Image cache hit (perceptual, {distance} bits) in {time.perf_counter() - started:.3f}s")
+                return results
+
+        ai_detection, description = await asyncio.gather(
+            self._timed(self.detect_ai_generated, decoded, self._fallback_ai_detection, "AI detection"),
+            self._timed(self.describe_image, decoded, self._fallback_description, "image description"),
+        )
         results = {
-            "ai_detection": self.detect_ai_generated(image_data),
-            "reverse_search": self.reverse_image_search(image_data),
-            "description": self.describe_image(image_data),
-            "metadata": self.extract_metadata(image_data)
+            "ai_detection": ai_detection,
+            "description": description,
+            "metadata": self.extract_metadata(decoded),
+            "phash": f"{decoded.phash:016x}" if decoded.phash is not None else None,
         }
+        await self._reverse_search(results, decoded.phash, sha256, claim_id)
+        if self.cache is not None and not any(
+            results[key].get("model") in FALLBACK_MODELS for key in ("ai_detection", "description")
+        ):
+            await asyncio.to_thread(self.cache.set, sha256, decoded.phash, results)
+        results["cache"] = {"hit": False, "tier": None, "distance": None}
         
         print("=" * 50)
-        print("Image analysis complete!")
+        print(f"Image analysis complete! ({time.perf_counter() - started:.2f}s)")
         print("=" * 50)
         
         return results
 
+    async def aanalyze_batch(self, readers: Sequence[Callable[[], Awaitable[bytes]]],
+                             decoder: Optional[Decoder] = None,
+                             concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Tuple[int, Dict]]:
+        """
+        Analyze many images, yielding (index, result) as each one finishes.
+        At most `concurrency` images are read and in flight at once, which
+        also bounds the remote model calls. Repeats of an image already in
+        the batch share its analysis and are marked `duplicate_of`. A failed
+        image yields {"error": ...} without stopping the rest.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        first_seen: Dict[str, Tuple[int, asyncio.Task]] = {}
+
+        async def run(index: int, read: Callable[[], Awaitable[bytes]]) -> Tuple[int, Dict]:
+            try:
+                async with semaphore:
+                    data = await read()
+                    sha256 = await asyncio.to_thread(content_hash, data)
+                    if sha256 in first_seen:
+                        original, analysis = first_seen[sha256]
+                        return index, {**await asyncio.shield(analysis), "duplicate_of": original}
+                    analysis = asyncio.ensure_future(self.aanalyze_image(data, sha256, decoder=decoder))
+                    first_seen[sha256] = (index, analysis)
+                    return index, await asyncio.shield(analysis)
+            except Exception as e:
+                print(f"ERROR analyzing batch image {index}: {e}")
+                return index, {"error": str(e)}
+
+        tasks = [asyncio.ensure_future(run(index, read)) for index, read in enumerate(readers)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The client went away or the caller stopped early: drop the remaining work
+            for task in tasks + [analysis for _, analysis in first_seen.values()]:
+                task.cancel()
+
+    async def _reverse_search(self, results: Dict, phash: Optional[int], sha256: str,
+                              claim_id: Optional[str]):
+        results["reverse_search"], results["provenance"] = await asyncio.to_thread(
+            self.reverse_image_search, phash, sha256, claim_id
+        )
+
+    async def _timed(self, call: Callable[[DecodedImage], Dict], decoded: DecodedImage,
+                     fallback: Callable[[DecodedImage], Dict], name: str) -> Dict:
+        """Run one blocking model call in a worker thread, falling back locally if it overruns."""
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(call, decoded), timeout=HF_INFERENCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"WARNING: {name} timed out after {HF_INFERENCE_TIMEOUT}s, using fallback")
+            return await asyncio.to_thread(fallback, decoded)
+
 
 # Global instance
 image_analyzer = ImageAnalyzer()
@@ -0,0 +1,238 @@
+"""
+Reverse Image Index
+Offline reverse image search over 64-bit perceptual hashes, stored in SQLite
+with multi-index hashing: each hash is split into four 16-bit chunks, each
+chunk column is indexed, and any hash within `max_distance` bits of a query
+must agree with it on at least one chunk to within max_distance // 4 bits.
+A lookup is a handful of indexed equality probes plus a Hamming check on the
+few candidates, so it stays in the milliseconds with millions of images.
+"""
+import os
+import time
+import sqlite3
+import threading
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+from PIL import Image
+
+IMAGE_INDEX_PATH = os.getenv("IMAGE_INDEX_PATH", os.path.join(os.path.dirname(__file__), "data", "image_index.db"))
+# Max differing bits (of 64) for two images to count as copies of each other
+REVERSE_SEARCH_MAX_DISTANCE = int(os.getenv("REVERSE_SEARCH_MAX_DISTANCE", "6"))
+REVERSE_SEARCH_LIMIT = int(os.getenv("REVERSE_SEARCH_LIMIT", "10"))
+
+_CHUNKS = 4
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit difference hash: shrink to 9x8 grayscale and record whether each
+    pixel is brighter than its right neighbour. Survives re-encoding,
+    resizing and mild recompression.
+    """
+    small = image.convert("L").resize((9, 8), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def split_hash(phash: int) -> Tuple[int, ...]:
+    return tuple((phash >> (_CHUNK_BITS * (_CHUNKS - 1 - i))) & _CHUNK_MASK for i in range(_CHUNKS))
+
+
+def join_hash(chunks: Iterable[int]) -> int:
+    phash = 0
+    for chunk in chunks:
+        phash = (phash << _CHUNK_BITS) | chunk
+    return phash
+
+
+def _variants(chunk: int, radius: int) -> List[int]:
+    """Every 16-bit value within `radius` bits of `chunk`."""
+    values = [chunk]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(_CHUNK_BITS), r):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def chunk_variants(phash: int, max_distance: int) -> List[List[int]]:
+    """
+    Per chunk of `phash`, the values a hash within `max_distance` bits must
+    take in that chunk for at least one of the chunks (pigeonhole).
+    """
+    tolerance = max_distance // _CHUNKS
+    return [_variants(chunk, tolerance) for chunk in split_hash(phash)]
+
+
+class ImageIndex:
+    """
+    Every analyzed or bulk-loaded image is one row per distinct file
+    (SHA-256), with its first and last sighting, a sighting count, optional
+    provenance (source, url, title) and the claims it was submitted with.
+    """
+
+    def __init__(self, path: str = IMAGE_INDEX_PATH, max_distance: int = REVERSE_SEARCH_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY,
+                sha256 TEXT NOT NULL UNIQUE,
+                h0 INTEGER NOT NULL, h1 INTEGER NOT NULL, h2 INTEGER NOT NULL, h3 INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                sightings INTEGER NOT NULL DEFAULT 1,
+                source TEXT,
+                url TEXT,
+                title TEXT
+            )"""
+        )
+        for i in range(_CHUNKS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_images_h{i} ON images (h{i})")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS image_claims (
+                image_id INTEGER NOT NULL,
+                claim_id TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (image_id, claim_id)
+            )"""
+        )
+
+    def add(self, phash: int, sha256: str, claim_id: Optional[str] = None, source: Optional[str] = None,
+            url: Optional[str] = None, title: Optional[str] = None, seen_at: Optional[float] = None) -> int:
+        """Record a sighting of an image and return its row id."""
+        seen_at = time.time() if seen_at is None else seen_at
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                image_id = self._upsert(phash, sha256, source, url, title, seen_at)
+                if claim_id:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO image_claims (image_id, claim_id, seen_at) VALUES (?, ?, ?)",
+                        (image_id, claim_id, seen_at),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return image_id
+
+    def add_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Bulk-load reference images in one transaction. Each row needs phash
+        and sha256 and may carry source, url, title and seen_at (epoch seconds).
+        """
+        count = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    self._upsert(row["phash"], row["sha256"], row.get("source"), row.get("url"),
+                                 row.get("title"), row.get("seen_at") or time.time())
+                    count += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def _upsert(self, phash: int, sha256: str, source: Optional[str], url: Optional[str],
+                title: Optional[str], seen_at: float) -> int:
+        # Keep the earliest sighting and the first provenance we were given
+        return self._conn.execute(
+            """INSERT INTO images (sha256, h0, h1, h2, h3, first_seen, last_seen, source, url, title)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(sha256) DO UPDATE SET
+                   first_seen = MIN(first_seen, excluded.first_seen),
+                   last_seen = MAX(last_seen, excluded.last_seen),
+                   sightings = sightings + 1,
+                   source = COALESCE(source, excluded.source),
+                   url = COALESCE(url, excluded.url),
+                   title = COALESCE(title, excluded.title)
+               RETURNING id""",
+            (sha256, *split_hash(phash), seen_at, seen_at, source, url, title),
+        ).fetchone()[0]
+
+    def search(self, phash: int, max_distance: Optional[int] = None,
+               limit: int = REVERSE_SEARCH_LIMIT) -> List[Dict]:
+        """Images within `max_distance` bits of `phash`, closest then earliest first."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        probes, params = [], []
+        for i, values in enumerate(chunk_variants(phash, max_distance)):
+            probes.append(f"SELECT id FROM images WHERE h{i} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT id, sha256, h0, h1, h2, h3, first_seen, last_seen, sightings, source, url, title
+                    FROM images WHERE id IN ({' UNION '.join(probes)})""",
+                params,
+            ).fetchall()
+            matches = []
+            for row in rows:
+                distance = bin(join_hash(row[2:6]) ^ phash).count("1")
+                if distance <= max_distance:
+                    matches.append((distance, row))
+            matches.sort(key=lambda m: (m[0], m[1][6]))
+            matches = matches[:limit]
+            claims = self._claims([row[0] for _, row in matches])
+
+        return [
+            {
+                "sha256": row[1],
+                "distance": distance,
+                "first_seen": row[6],
+                "last_seen": row[7],
+                "sightings": row[8],
+                "source": row[9],
+                "url": row[10],
+                "title": row[11],
+                "claim_ids": claims.get(row[0], []),
+            }
+            for distance, row in matches
+        ]
+
+    def _claims(self, image_ids: List[int]) -> Dict[int, List[str]]:
+        if not image_ids:
+            return {}
+        claims: Dict[int, List[str]] = {}
+        for image_id, claim_id in self._conn.execute(
+            f"""SELECT image_id, claim_id FROM image_claims WHERE image_id IN ({','.join('?' * len(image_ids))})
+                ORDER BY seen_at""",
+            image_ids,
+        ):
+            claims.setdefault(image_id, []).append(claim_id)
+        return claims
+
+    def provenance(self, matches: List[Dict]) -> Dict:
+        """Summarize search() results: seen before, earliest sighting, which claims used it."""
+        if not matches:
+            return {"seen_before": False, "earliest_sighting": None, "claim_ids": [], "copies": 0}
+        earliest = min(matches, key=lambda m: m["first_seen"])
+        claim_ids = list(dict.fromkeys(c for m in matches for c in m["claim_ids"]))
+        return {
+            "seen_before": True,
+            "earliest_sighting": {k: earliest[k] for k in ("first_seen", "source", "url", "title", "distance")},
+            "claim_ids": claim_ids,
+            "copies": len(matches),
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def stats(self) -> Dict:
+        return {"path": self.path, "images": len(self), "max_distance": self.max_distance}
@@ -0,0 +1,55 @@
+"""
+Keyword Matching Module
+Matches a fixed keyword set against text in a single pass. Every accepted
+word form of every keyword is expanded once into a lookup table, so matching
+is one tokenizing scan of the text plus a set intersection, instead of one
+substring search per keyword.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class KeywordMatcher:
+    """
+    Word-boundary aware multi-keyword matcher with per-keyword weights.
+    Keywords are single words and match only themselves plus the word forms
+    listed for them in `forms` (keyword -> forms). There are no generic suffix
+    rules: "war" -> ("wars",) matches "wars" but not "award", "ward" or "wares".
+    """
+
+    def __init__(self, weights: Dict[str, float],
+                 forms: Optional[Dict[str, Iterable[str]]] = None):
+        self.weights = {k.lower(): w for k, w in weights.items()}
+        # word form -> keyword; a form that is itself a keyword stays that keyword
+        self.forms: Dict[str, str] = {}
+        for keyword, words in (forms or {}).items():
+            if keyword.lower() in self.weights:
+                for word in words:
+                    self.forms.setdefault(word.lower(), keyword.lower())
+        self.forms.update({k: k for k in self.weights})
+        self._form_set = frozenset(self.forms)
+
+    def find(self, text: str) -> List[str]:
+        """Return matched keywords in order of first appearance, without duplicates."""
+        words = _WORD_RE.findall(text.lower())
+        # Most headlines match nothing; the C-level intersection rejects them cheaply
+        if self._form_set.isdisjoint(words):
+            return []
+        found = []
+        for word in words:
+            keyword = self.forms.get(word)
+            if keyword and keyword not in found:
+                found.append(keyword)
+        return found
+
+    def weight(self, keywords: List[str]) -> float:
+        return sum(self.weights.get(k, 0.0) for k in keywords)
+
+    def match(self, text: str) -> Optional[Dict]:
+        """Return the matched keywords and their total weight, or None when nothing matched."""
+        keywords = self.find(text)
+        if not keywords:
+            return None
+        return {"keywords": keywords, "weight": self.weight(keywords)}
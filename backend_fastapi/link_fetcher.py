@@ -0,0 +1,301 @@
+"""
+Link Fetching Module
+Streams user-supplied links and extracts the page title and main text with an
+incremental HTML parser. Non-text responses are rejected from their headers,
+reading stops at a byte cap or as soon as enough text has been collected, so a
+20 MB page costs about as much as a small one. Extracted content is cached on
+disk and revalidated with conditional requests.
+"""
+import os
+import time
+import codecs
+import asyncio
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional
+import httpx
+from cache import HttpContentCache
+
+LINK_FETCH_TIMEOUT = float(os.getenv("LINK_FETCH_TIMEOUT", "10"))
+# Never read more than this many bytes of a linked page
+LINK_MAX_BYTES = int(os.getenv("LINK_MAX_BYTES", str(2 * 1024 * 1024)))
+# Characters of page text kept as evidence
+LINK_TEXT_CHARS = int(os.getenv("LINK_TEXT_CHARS", "1000"))
+# Extracted-content cache: total size on disk, and freshness when a server sends no caching headers
+LINK_CACHE_ENABLED = os.getenv("LINK_CACHE_ENABLED", "true").lower() == "true"
+LINK_CACHE_MAX_BYTES = int(os.getenv("LINK_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LINK_CACHE_DEFAULT_TTL = float(os.getenv("LINK_CACHE_DEFAULT_TTL", "3600"))
+LINK_CACHE_MAX_HEURISTIC_TTL = 24 * 3600
+
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# Elements whose text is never part of the readable page
+_SKIP_TAGS = frozenset(("script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"))
+# Elements that usually wrap the article itself
+_MAIN_TAGS = frozenset(("main", "article"))
+
+
+class UnsupportedContentError(ValueError):
+    """The link points at something other than a text page (PDF, image, video...)."""
+
+
+class LinkContent(NamedTuple):
+    url: str
+    title: Optional[str]
+    text: str
+    content_type: str
+    bytes_read: int
+    truncated: bool  # Stopped before the end of the body
+    cache: str = "miss"  # "fresh" (no request), "revalidated" (304) or "miss"
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects the <title> and visible text of an HTML document as it is fed.
+    Text inside <main>/<article> is kept separately and preferred. `done`
+    turns True once enough text is collected, so callers can stop reading.
+    """
+
+    def __init__(self, max_chars: int = LINK_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title: Optional[str] = None
+        self._title_parts: List[str] = []
+        self._og_title: Optional[str] = None
+        self._in_title = False
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._body: List[str] = []
+        self._main: List[str] = []
+        self._body_chars = 0
+        self._main_chars = 0
+
+    @property
+    def done(self) -> bool:
+        return self._main_chars >= self.max_chars or self._body_chars >= self.max_chars
+
+    @property
+    def text(self) -> str:
+        parts = self._main if self._main else self._body
+        return " ".join(parts)[:self.max_chars]
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            if attrs.get("property") == "og:title" and attrs.get("content"):
+                self._og_title = attrs["content"]
+        elif tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <meta .../>: never opens a scope
+        if tag == "meta":
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = " ".join("".join(self._title_parts).split()) or None
+        elif tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in _MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip_depth or self.done:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        self._body.append(text)
+        self._body_chars += len(text) + 1
+        if self._main_depth:
+            self._main.append(text)
+            self._main_chars += len(text) + 1
+
+    def close_title(self) -> Optional[str]:
+        """Title from <title>, else og:title; also covers documents cut off mid-title."""
+        if self.title is None and self._title_parts:
+            self.title = " ".join("".join(self._title_parts).split()) or None
+        return self.title or self._og_title
+
+
+def content_type_of(response: httpx.Response) -> str:
+    return response.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def _decoder(encoding: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def freshness_lifetime(headers: httpx.Headers, default: float = LINK_CACHE_DEFAULT_TTL) -> Optional[float]:
+    """
+    Seconds a response may be reused without revalidation, following
+    Cache-Control, then Expires, then the Last-Modified heuristic. None means
+    it must not be stored. We are a shared cache, so "private" counts as
+    "no-store".
+    """
+    directives = {}
+    for part in headers.get("cache-control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+
+    date = _http_date(headers.get("date")) or time.time()
+    expires = headers.get("expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        # Unparseable Expires (e.g. "0") means already expired
+        return max(0.0, expires_at - date) if expires_at else 0.0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified:
+        # RFC 9111 heuristic: 10% of the time since the last change
+        return min(max(0.0, (date - last_modified) * 0.1), LINK_CACHE_MAX_HEURISTIC_TTL)
+    return default
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class LinkFetcher:
+    """
+    Fetches a link as a stream. The content type is checked before any of
+    the body is read, and at most `max_bytes` are downloaded. With a cache,
+    fresh entries are served without a request and stale ones are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged page
+    costs a 304 instead of a download and parse.
+    """
+
+    def __init__(self, timeout: float = LINK_FETCH_TIMEOUT, max_bytes: int = LINK_MAX_BYTES,
+                 max_chars: int = LINK_TEXT_CHARS, cache: Optional[HttpContentCache] = None):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.cache = cache
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+
+    async def fetch(self, link: str, client: Optional[httpx.AsyncClient] = None) -> LinkContent:
+        """Fetch with the given shared client, or a one-off client when there is none."""
+        # The cache is SQLite; its calls run on a thread so the event loop never waits on disk
+        cached = await asyncio.to_thread(self.cache.get, link) if self.cache is not None else None
+        if cached and cached["expires_at"] > time.time():
+            self.fresh_hits += 1
+            return self._from_cache(link, cached, "fresh")
+
+        if client is not None:
+            return await self.fetch_with(client, link, cached)
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            return await self.fetch_with(client, link, cached)
+
+    async def fetch_with(self, client: httpx.AsyncClient, link: str, cached: Optional[Dict] = None) -> LinkContent:
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with client.stream("GET", link, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                self.revalidated += 1
+                lifetime = freshness_lifetime(response.headers) or 0.0
+                await asyncio.to_thread(self.cache.revalidated, link, time.time() + lifetime,
+                                        response.headers.get("etag"), response.headers.get("last-modified"))
+                return self._from_cache(link, cached, "revalidated")
+
+            response.raise_for_status()
+            page = await self._read(response, link)
+
+        self.downloads += 1
+        lifetime = freshness_lifetime(response.headers)
+        if self.cache is not None and lifetime is None and cached:
+            await asyncio.to_thread(self.cache.delete, link)
+        elif self.cache is not None and lifetime is not None:
+            await asyncio.to_thread(
+                self.cache.set,
+                link,
+                {"title": page.title, "text": page.text, "content_type": page.content_type, "truncated": page.truncated},
+                time.time() + lifetime,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+            )
+        return page
+
+    async def _read(self, response: httpx.Response, link: str) -> LinkContent:
+        content_type = content_type_of(response)
+        # A missing header is common on small sites; sniff it as HTML
+        if content_type and content_type not in TEXT_CONTENT_TYPES:
+            raise UnsupportedContentError(f"Unsupported content type: {content_type}")
+
+        decoder = _decoder(response.charset_encoding)
+        extractor = TextExtractor(self.max_chars)
+        plain = content_type == "text/plain"
+        plain_parts: List[str] = []
+        bytes_read = 0
+        truncated = False
+
+        async for chunk in response.aiter_bytes():
+            chunk = chunk[:self.max_bytes - bytes_read]
+            bytes_read += len(chunk)
+            text = decoder.decode(chunk)
+            if plain:
+                plain_parts.append(text)
+                if sum(len(p) for p in plain_parts) >= self.max_chars:
+                    truncated = True
+                    break
+            else:
+                # Parsing is CPU bound; keep big chunks off the event loop
+                if len(text) > 65536:
+                    await asyncio.to_thread(extractor.feed, text)
+                else:
+                    extractor.feed(text)
+                if extractor.done:
+                    truncated = True
+                    break
+            if bytes_read >= self.max_bytes:
+                truncated = True
+                break
+
+        if plain:
+            return LinkContent(link, None, " ".join("".join(plain_parts).split())[:self.max_chars],
+                               content_type, bytes_read, truncated)
+        return LinkContent(link, extractor.close_title(), extractor.text,
+                           content_type or "text/html", bytes_read, truncated)
+
+    def _from_cache(self, link: str, cached: Dict, status: str) -> LinkContent:
+        value = cached["value"]
+        return LinkContent(link, value["title"], value["text"], value["content_type"], 0, value["truncated"], status)
+
+    def stats(self) -> Dict:
+        stats = {"fresh_hits": self.fresh_hits, "revalidated": self.revalidated, "downloads": self.downloads}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
@@ -0,0 +1,102 @@
+"""
+Bulk-load a reference image corpus into the local reverse-search index.
+Images are hashed in a process pool the same way uploads are (shrunk to
+IMAGE_MODEL_MAX_SIDE, then dHash) and written in batches, so a corpus of
+millions of images loads without any external service.
+
+Usage:
+    python load_image_corpus.py DIRECTORY [--source NAME]
+    python load_image_corpus.py MANIFEST.csv
+
+A CSV manifest has a `path` column (relative to the CSV) and optional `url`,
+`title`, `source` and `seen_at` (epoch seconds or ISO 8601 date) columns.
+"""
+import os
+import io
+import sys
+import csv
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+from PIL import Image
+from image_index import ImageIndex, perceptual_hash
+
+IMAGE_MODEL_MAX_SIDE = int(os.getenv("IMAGE_MODEL_MAX_SIDE", "512"))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+BATCH_SIZE = 5000
+
+
+def hash_file(path: str) -> Optional[Tuple[str, int]]:
+    """(sha256, phash) of one file, matching what ImageAnalyzer records for uploads."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        image = Image.open(io.BytesIO(data))
+        image.thumbnail((IMAGE_MODEL_MAX_SIDE, IMAGE_MODEL_MAX_SIDE), Image.Resampling.LANCZOS)
+        return hashlib.sha256(data).hexdigest(), perceptual_hash(image)
+    except Exception as e:
+        print(f"Skipping {path}: {e}", file=sys.stderr)
+        return None
+
+
+def _seen_at(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def iter_entries(target: str, source: Optional[str]) -> Iterator[Dict]:
+    if os.path.isdir(target):
+        for root, _, files in os.walk(target):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield {"path": path, "source": source, "seen_at": os.path.getmtime(path)}
+        return
+    base = os.path.dirname(os.path.abspath(target))
+    with open(target, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {
+                "path": os.path.join(base, row["path"]),
+                "url": row.get("url") or None,
+                "title": row.get("title") or None,
+                "source": row.get("source") or source,
+                "seen_at": _seen_at(row.get("seen_at", "")),
+            }
+
+
+def load(index: ImageIndex, target: str, source: Optional[str] = None, workers: Optional[int] = None) -> int:
+    loaded = 0
+    entries = iter_entries(target, source)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = [entry for _, entry in zip(range(BATCH_SIZE), entries)]
+            if not chunk:
+                break
+            batch = []
+            for entry, hashed in zip(chunk, pool.map(hash_file, [e["path"] for e in chunk], chunksize=64)):
+                if hashed:
+                    entry["sha256"], entry["phash"] = hashed
+                    batch.append(entry)
+            loaded += index.add_many(batch)
+            print(f"Loaded {loaded} images")
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load reference images into the reverse-search index.")
+    parser.add_argument("target", help="Directory of images or CSV manifest")
+    parser.add_argument("--source", help="Source label for images without one (e.g. an archive name)")
+    parser.add_argument("--workers", type=int, help="Hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = ImageIndex()
+    count = load(index, args.target, args.source, args.workers)
+    print(f"Indexed {count} images in {time.perf_counter() - started:.1f}s ({len(index)} total)")
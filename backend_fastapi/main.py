@@ -1,16 +1,73 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Literal
+from contextlib import asynccontextmanager
+from functools import partial
+import os
+import json
+import time
 import uuid
+import asyncio
+import zipfile
 from datetime import datetime
+import httpx
+from PIL import Image, UnidentifiedImageError
 from models import (
     Claim, Evidence, ScoreResponse, ExplainResponse, 
-    CrisisResponse, ScanRequest, ScoreRequest, ExplainRequest
+    CrisisResponse, ScanRequest, ScoreRequest, ExplainRequest,
+    ScoreBatchRequest, ScoreBatchResponse
 )
-from agents import ScanAgent, VerifyAgent, ScoreAgent, ExplainAgent, CrisisAgent
-from image_analyzer import image_analyzer
+from agents import ScanAgent, VerifyAgent, ScoreAgent, ExplainAgent, CrisisAgent, MAX_CRISIS_ALERTS
+from image_analyzer import image_analyzer, decode_detached
+from claim_store import ClaimStore
+from cache import StaleWhileRevalidateCache
+from scheduler import CategoryPrefetcher
+from http_clients import HttpClients
+from uploads import (
+    SpooledUpload, spool_upload, read_upload, download_image, archive_images, UploadTooLargeError,
+    TooManyImagesError,
+    IMAGE_MAX_UPLOAD_BYTES, BATCH_MAX_IMAGES, BATCH_MAX_BYTES
+)
+from link_fetcher import UnsupportedContentError
+from forensics import analyze_image_bytes
+from worker_pool import WorkerPool
+from similar_claims import ClaimIndex
+
+try:
+    from contextlib import aclosing
+except ImportError:  # Python < 3.10
+    @asynccontextmanager
+    async def aclosing(thing):
+        try:
+            yield thing
+        finally:
+            await thing.aclose()
 
-app = FastAPI(title="Crux-AI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled clients live for the whole app so upstream connections are reused
+    http_clients.open()
+    # Worker processes start before any request threads exist
+    worker_pool.start()
+    # Keep every news category warm so page views never wait on NewsData
+    if NEWS_PREFETCH_ENABLED and scan_agent.api_key:
+        news_prefetcher.start()
+    yield
+    await news_prefetcher.stop()
+    await run_in_threadpool(claim_index.save)
+    await http_clients.aclose()
+    await run_in_threadpool(worker_pool.shutdown)
+    await run_in_threadpool(claim_store.close)
+
+app = FastAPI(title="Crux-AI Backend", lifespan=lifespan)
+
+# Largest request body accepted: one image plus room for the form fields
+MAX_REQUEST_BYTES = IMAGE_MAX_UPLOAD_BYTES + 1024 * 1024
+# Album uploads get their own, larger cap
+BATCH_ANALYZE_PATH = "/api/images/analyze-batch"
 
 # CORS Setup
 app.add_middleware(
@@ -21,127 +78,324 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_requests(request: Request, call_next):
+    # Multipart bodies are parsed before the route runs; refuse declared oversize bodies up front
+    length = request.headers.get("content-length")
+    limit = BATCH_MAX_BYTES + 1024 * 1024 if request.url.path == BATCH_ANALYZE_PATH else MAX_REQUEST_BYTES
+    if length and length.isdigit() and int(length) > limit:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
 # Initialize Agents
-scan_agent = ScanAgent()
-verify_agent = VerifyAgent()
+http_clients = HttpClients()
+scan_agent = ScanAgent(http=http_clients)
+verify_agent = VerifyAgent(http=http_clients)
 score_agent = ScoreAgent()
 explain_agent = ExplainAgent()
 crisis_agent = CrisisAgent()
+worker_pool = WorkerPool()
 
-# In-memory storage for demo purposes
-processed_claims: List[Claim] = []
+# Persistent, bounded claim storage shared by all workers
+claim_store = ClaimStore()
+DEDUP_SEED_CLAIMS = 5000
+DEFAULT_CLAIMS_PAGE = 100
+MAX_CLAIMS_PAGE = 1000
+
+# Per-category news responses; stale entries are served while one refresh runs
+news_cache = StaleWhileRevalidateCache(
+    ttl=float(os.getenv("NEWS_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("NEWS_CACHE_STALE_TTL", "3600"))
+)
+news_prefetcher = CategoryPrefetcher(scan_agent, news_cache)
+NEWS_PREFETCH_ENABLED = os.getenv("NEWS_PREFETCH_ENABLED", "true").lower() == "true"
+# Rebuild crisis alerts and headline clusters for claims that survived a restart
+crisis_agent.ingest(claim_store.recent(MAX_CRISIS_ALERTS))
+scan_agent.remember(claim_store.recent(DEDUP_SEED_CLAIMS))
+# Previously scored claims, so paraphrases reuse the verdict instead of a new search
+# The index mirrors the store: snapshots record how far they got, and a restart
+# (clean or not) only indexes claims stored after that
+claim_index = ClaimIndex(as_of=claim_store.last_seq)
+claim_store.on_evict = claim_index.remove
+indexed_as_of = claim_index.load() or 0
+claim_index.rebuild(Claim.model_validate_json(data) for _, data in claim_store.iter_rows(after=indexed_as_of))
+# Set once the first empty /api/crisis call has kicked off a news scan
+crisis_bootstrap_started = False
 
 @app.get("/")
 def health_check():
     return {"status": "CruxAI System Online"}
 
-@app.get("/api/claims", response_model=List[Claim])
-def get_claims():
-    return processed_claims
+@app.get("/api/claims")
+def get_claims(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_CLAIMS_PAGE),
+    after: int = Query(0, ge=0),
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """
+    List stored claims, oldest first.
+    - `after`: cursor from the previous page's `next_cursor`
+    - `status` / `source`: filters
+    - `fields`: comma-separated projection, e.g. `id,text,status,score` to skip evidence
+    - `format=ndjson`: stream one claim per line; `limit` is optional in this mode
+    """
+    projection = None
+    if fields:
+        projection = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(projection) - set(Claim.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown claim fields: {', '.join(sorted(unknown))}")
+
+    def render(data: str) -> str:
+        # Stored rows are already Claim JSON; only re-encode when projecting
+        if projection is None:
+            return data
+        claim = json.loads(data)
+        return json.dumps({f: claim.get(f) for f in projection})
+
+    if format == "ndjson":
+        rows = claim_store.iter_rows(after=after, status=status, source=source, limit=limit)
+        return StreamingResponse((render(data) + "\n" for _, data in rows), media_type="application/x-ndjson")
+
+    page_size = limit or DEFAULT_CLAIMS_PAGE
+    rows = claim_store.page(after=after, limit=page_size, status=status, source=source)
+    next_cursor = rows[-1][0] if len(rows) == page_size else None
+    body = '{"claims":[' + ",".join(render(data) for _, data in rows) + '],"next_cursor":' + json.dumps(next_cursor) + "}"
+    return Response(content=body, media_type="application/json")
 
 @app.post("/api/verify")
 async def verify_claim(
     text: str = Form(None),
     link: str = Form(None),
-    image: UploadFile = File(None)
+    image: UploadFile = File(None),
+    format: Literal["json", "ndjson", "sse"] = "json"
 ):
-    # Handle cases where only link or image is provided
-    claim_text = text or ""
-    
-    # Create a new claim object
     """
     Verify a claim (text, link, or image).
     Now supports AI-generated image detection!
+    - `format=sse` / `format=ndjson`: stream each stage as it completes
+      (started, claim or match, link, evidence..., score, image_analysis,
+      result) instead of one response at the end; disconnecting stops the
+      stages still running
+    """
+    # Copy the upload into a capped buffer first so oversized files fail fast
+    upload = None
+    if image:
+        print(f"Received image: {image.filename}")
+        try:
+            upload = await spool_upload(image)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        print(f"Image size: {upload.size} bytes")
+
+    stages = verify_stages(text, link, upload)
+    if format == "json":
+        async with aclosing(stages):
+            async for event, data in stages:
+                if event == "result":
+                    return data
+
+    def render(event: str, data) -> str:
+        payload = json.dumps(jsonable_encoder(data))
+        if format == "sse":
+            return f"event: {event}\ndata: {payload}\n\n"
+        return f'{{"event":{json.dumps(event)},"data":{payload}}}\n'
+
+    async def events():
+        # Something goes out at once, so clients see the request was taken
+        yield render("started", {"text": bool(text), "link": link, "image": upload is not None})
+        async with aclosing(stages):
+            async for event, data in stages:
+                yield render(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        # Stop proxies from holding events back until the response completes
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def verify_stages(text: Optional[str], link: Optional[str], upload: Optional[SpooledUpload]):
+    """
+    The /api/verify pipeline as (event, data) pairs, yielded as each stage
+    completes and ending with ("result", full response). Closing it early
+    cancels the stage in progress; the spooled image is closed either way.
     """
     result = {
         "claim": None,
         "score": None,
-        "image_analysis": None
+        "image_analysis": None,
+        "match": None
     }
-    
-    # Handle text/link verification (existing functionality)
-    if text or link:
-        claim_text = text if text else f"Claim from: {link}"
-        
-        # Create a new claim object
-        claim = Claim(
-            id=str(uuid.uuid4()),
-            text=claim_text,
-            status="processing"
-        )
-
-        # Verify using existing agents
-        claim = verify_agent.verify(claim, link=link) # Assuming verify_agent.verify can take a Claim object and link
-        score = score_agent.score(claim)
-        
-        # Set status based on score
-        if score.verdict == "VERIFIED": # Assuming score object has a verdict
-            claim.status = "verified"
-        elif score.verdict == "FALSE": # Assuming score object has a verdict
-            claim.status = "false"
-        else:
-            claim.status = "unverified"
-        
-        processed_claims.append(claim)
-        
-        result["claim"] = claim
-        result["score"] = score
-    
-    # Handle image analysis (NEW functionality)
-    if image:
-        try:
-            print(f"Received image: {image.filename}")
-            
-            # Read image data
-            image_data = await image.read()
-            print(f"Image size: {len(image_data)} bytes")
-            
-            # Analyze image
-            analysis = image_analyzer.analyze_image(image_data)
-            
+
+    try:
+        # Handle text/link verification (existing functionality)
+        if text or link:
+            claim_text = text if text else f"Claim from: {link}"
+
+            # A paraphrase of a claim we already scored reuses that verdict.
+            # Link claims are always re-verified, since the page is the evidence.
+            match = await asyncio.to_thread(claim_index.search, claim_text) if not link else None
+            prior = await asyncio.to_thread(claim_store.get, match["claim_id"]) if match else None
+            if prior:
+                result["claim"] = prior
+                result["score"] = match["score"]
+                result["match"] = {"claim_id": prior.id, "text": prior.text}
+                yield "match", result["match"]
+            else:
+                # Create a new claim object
+                claim = Claim(
+                    id=str(uuid.uuid4()),
+                    text=claim_text,
+                    status="processing"
+                )
+                yield "claim", claim
+
+                # Verify using the async agent paths so the event loop stays free
+                async with aclosing(verify_agent.averify_events(claim, link=link)) as evidence_stages:
+                    async for event, data in evidence_stages:
+                        yield event, data
+                score = await score_agent.ascore(claim)
+
+                # Set status based on score
+                if score.verdict == "VERIFIED": # Assuming score object has a verdict
+                    claim.status = "verified"
+                elif score.verdict == "FALSE": # Assuming score object has a verdict
+                    claim.status = "false"
+                else:
+                    claim.status = "unverified"
+                claim.score = score
+
+                await asyncio.to_thread(claim_store.add, claim)
+                crisis_agent.ingest([claim])
+                if not link:
+                    await asyncio.to_thread(claim_index.add, claim.id, claim.text, score)
+
+                result["claim"] = claim
+                result["score"] = score
+                yield "score", {"claim_id": claim.id, "status": claim.status, "score": score}
+
+        # Handle image analysis (NEW functionality)
+        if upload:
+            try:
+                # Decode once, then run the HF model calls concurrently.
+                # The sighting is recorded against the claim it came with.
+                claim_id = result["claim"].id if result["claim"] else None
+                analysis = await image_analyzer.aanalyze_image(upload.file, upload.sha256, claim_id)
+                print("Image analysis complete!")
+
+            except Exception as e:
+                print(f"ERROR analyzing image: {e}")
+                analysis = {
+                    "error": str(e),
+                    "message": "Failed to analyze image"
+                }
             result["image_analysis"] = analysis
-            print("Image analysis complete!")
-            
-        except Exception as e:
-            print(f"ERROR analyzing image: {e}")
-            result["image_analysis"] = {
-                "error": str(e),
-                "message": "Failed to analyze image"
-            }
-    
-    return result
+            yield "image_analysis", analysis
+
+        yield "result", result
+    finally:
+        if upload:
+            upload.file.close()
 
 @app.post("/api/score", response_model=ScoreResponse)
-def score_claim(request: ScoreRequest):
+async def score_claim(request: ScoreRequest):
     # Construct a temporary claim object for scoring
     claim = Claim(
         text=request.claim_text,
         evidence=request.evidence
     )
-    return score_agent.score(claim)
+    return await score_agent.ascore(claim)
+
+@app.post("/api/score/batch", response_model=ScoreBatchResponse)
+def score_claims_batch(request: ScoreBatchRequest):
+    """Score many claims with as few LLM round trips as possible; results keep request order."""
+    claims = [Claim(text=item.claim_text, evidence=item.evidence) for item in request.items]
+    return ScoreBatchResponse(results=score_agent.score_many(claims))
+
+@app.post("/api/score/invalidate")
+def invalidate_score(request: ScoreRequest):
+    """Drop the cached verdict for this claim + evidence so the next score call re-runs the LLM."""
+    score_agent.verdict_cache.invalidate(request.claim_text, request.evidence)
+    return {"invalidated": True}
+
+@app.delete("/api/score/cache")
+def clear_score_cache():
+    score_agent.verdict_cache.clear()
+    return {"cleared": True}
 
 @app.post("/api/explain", response_model=ExplainResponse)
 def explain_verdict(request: ExplainRequest):
-    explanation = explain_agent.explain(request.claim_text, request.verdict, request.lang)
+    explanation = explain_agent.explain({
+        "claim": request.claim_text,
+        "verdict": request.verdict,
+        "lang": request.lang
+    })
     return ExplainResponse(explanation=explanation)
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return {
+        "evidence_search": verify_agent.search_cache.stats(),
+        "verdicts": score_agent.verdict_cache.stats(),
+        "claims": claim_store.stats(),
+        "news": news_cache.stats(),
+        "news_prefetch": news_prefetcher.stats(),
+        "headline_clusters": scan_agent.clusterer.stats(),
+        "similar_claims": claim_index.stats(),
+        "links": verify_agent.link_fetcher.stats(),
+        "images": image_analyzer.cache.stats() if image_analyzer.cache is not None else None,
+        "image_index": image_analyzer.index.stats() if image_analyzer.index is not None else None,
+        "http": http_clients.stats(),
+        "workers": worker_pool.stats(),
+    }
+
+@app.get("/api/usage")
+def get_token_usage():
+    """Running LLM token totals per agent."""
+    return {
+        "score": score_agent.usage.stats(),
+        "explain": explain_agent.usage.stats(),
+    }
+
 @app.get("/api/crisis", response_model=CrisisResponse)
-def check_crisis():
-    claims_to_check = processed_claims
-    # If no claims have been processed locally, fetch fresh news to check for crises
-    if not claims_to_check:
-        print("No local claims found. Scanning for breaking news...")
-        claims_to_check = scan_agent.scan()
-        
-    return crisis_agent.detect_crisis(claims_to_check)
+def check_crisis(background_tasks: BackgroundTasks, cursor: int = 0):
+    """
+    Return crisis alerts newer than `cursor`. Alerts are kept up to date as
+    claims arrive, so this never rescans the claim list.
+    """
+    global crisis_bootstrap_started
+    # If no claims have been processed locally, fetch fresh news in the background
+    if not crisis_bootstrap_started and claim_store.count() == 0:
+        print("No local claims found. Scanning for breaking news in the background...")
+        crisis_bootstrap_started = True
+        background_tasks.add_task(background_scan, None)
+
+    return crisis_agent.alerts_since(cursor)
 
-def background_scan(source_url: str):
-    new_claims = scan_agent.scan(source_url)
-    for claim in new_claims:
-        claim.id = str(uuid.uuid4())
-        # Optional: Auto-verify scanned claims?
-        # For now, just add them
-        processed_claims.append(claim)
+def background_scan(source_url: Optional[str]):
+    scanned = scan_agent.scan(source_url)
+    # Stories we already hold only contribute their sources as extra evidence
+    new_claims, merges = scan_agent.dedupe_known(scanned)
+    updated = []
+    for claim_id, folded in merges.items():
+        known = claim_store.get(claim_id)
+        if known:
+            urls = {e.url for e in known.evidence}
+            for evidence in (e for claim in folded for e in claim.evidence):
+                # Several re-reports often cite the same source; keep it once
+                if evidence.url not in urls:
+                    urls.add(evidence.url)
+                    known.evidence.append(evidence)
+            updated.append(known)
+    # Optional: Auto-verify scanned claims?
+    # For now, just store them in one batch
+    claim_store.add_many(new_claims + updated)
+    # Re-reports still go to the crisis agent: a folded headline may carry the alert its canonical claim didn't
+    crisis_agent.ingest(new_claims + [claim for folded in merges.values() for claim in folded])
 
 @app.post("/api/scan")
 def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
@@ -149,14 +403,24 @@ def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
     return {"message": f"Scan initiated for {request.source_url}"}
 
 @app.get("/api/news/{category}")
-def get_news_by_category(category: str):
-    """Fetch news by category"""
+async def get_news_by_category(category: str):
+    """Fetch news by category, served from the stale-while-revalidate cache"""
     try:
-        claims = scan_agent.scan_by_category(category)
+        # Categories that map to the same NewsData category share one entry
+        cache_key = scan_agent.api_category(category)
+        try:
+            claims, age, cache_status = await news_cache.get(
+                cache_key, lambda: run_in_threadpool(scan_agent.fetch_category, category)
+            )
+        except Exception as e:
+            print(f"Serving fallback news for {category}: {e}")
+            claims, age, cache_status = scan_agent._get_mock_news_by_category(category), 0.0, "fallback"
         return {
             "category": category,
             "count": len(claims),
-            "articles": claims
+            "articles": claims,
+            "cache_status": cache_status,
+            "cache_age_seconds": round(age, 1)
         }
     except Exception as e:
         print(f"Error fetching news for category {category}: {e}")
@@ -165,8 +429,8 @@ def get_news_by_category(category: str):
 @app.get("/api/agents")
 def get_agents_status():
     try:
-        # Calculate stats based on processed_claims
-        total_processed = len(processed_claims)
+        # Calculate stats based on stored claims
+        total_processed = claim_store.count()
         
         return {
             "agents": [
@@ -213,23 +477,110 @@ def get_agents_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/forensics")
-def analyze_media(
+async def analyze_media(
     url: str = Form(None),
     file: UploadFile = File(None)
 ):
-    # Mock forensic analysis
-    import random
-    score = random.randint(10, 90)
-    
-    return {
-        "defakeScore": score,
-        "manipulations": [
-            "Potential face manipulation detected" if score > 50 else "No significant manipulation detected",
-            "Compression artifacts analyzed"
-        ],
-        "provenance": "Source origin analysis completed.",
-        "recommendation": "HIGH RISK" if score > 60 else ("MODERATE RISK" if score > 30 else "LIKELY AUTHENTIC")
-    }
+    """
+    Local forensic analysis of one image (upload or image URL): error level
+    analysis, JPEG quantization and double compression, copy-move, EXIF
+    consistency and generator artifacts, run in the worker process pool.
+    """
+    try:
+        if file is not None:
+            upload = await spool_upload(file)
+            try:
+                data = upload.file.read()
+            finally:
+                upload.file.close()
+        elif url:
+            data = await download_image(url, http_clients.async_client)
+        else:
+            raise HTTPException(status_code=400, detail="Provide a file or an image URL")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedContentError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Could not fetch image: {e}")
+
+    try:
+        return await worker_pool.run(analyze_image_bytes, data)
+    except UnidentifiedImageError:
+        # Pillow's message names the in-memory file object, which means nothing to the client
+        raise HTTPException(status_code=415, detail="Unsupported or unreadable image")
+    except Image.DecompressionBombError as e:
+        raise HTTPException(status_code=415, detail=f"Unsupported or unreadable image: {e}")
+
+@app.post(BATCH_ANALYZE_PATH)
+async def analyze_image_batch(
+    files: List[UploadFile] = File(None),
+    archive: UploadFile = File(None)
+):
+    """
+    Analyze an album in one request: images as multipart `files`, a zip
+    `archive`, or both. Images are decoded in the worker processes and run
+    through the same analysis as /api/verify, several at a time. Results
+    stream back as NDJSON in the order they finish, one line per image
+    ({"index", "filename", ...analysis}), then {"done": true, ...}.
+    """
+    names = [upload.filename for upload in files or []]
+    readers = [partial(read_upload, upload) for upload in files or []]
+
+    spool = zip_file = None
+
+    def close_archive():
+        if zip_file is not None:
+            zip_file.close()
+        if spool is not None:
+            spool.file.close()
+
+    too_many = f"At most {BATCH_MAX_IMAGES} images per batch, got {{}}"
+    if len(readers) > BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=too_many.format(len(readers)))
+    # Don't spool an archive the loose files left no room for
+    if archive is not None and len(readers) == BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_IMAGES} images per batch, "
+                                                    f"and the {len(readers)} files leave no room for an archive")
+
+    if archive is not None:
+        try:
+            spool = await spool_upload(archive, max_bytes=BATCH_MAX_BYTES)
+            zip_file = zipfile.ZipFile(spool.file)
+            members = archive_images(zip_file, BATCH_MAX_IMAGES - len(readers))
+        except zipfile.BadZipFile as e:
+            close_archive()
+            raise HTTPException(status_code=400, detail=f"Not a valid zip archive: {e}")
+        except TooManyImagesError as e:
+            close_archive()
+            raise HTTPException(status_code=413, detail=too_many.format(len(readers) + e.count))
+        except ValueError as e:
+            close_archive()
+            raise HTTPException(status_code=413, detail=str(e))
+        names += [info.filename for info in members]
+        readers += [partial(asyncio.to_thread, zip_file.read, info) for info in members]
+
+    if not readers:
+        close_archive()
+        raise HTTPException(status_code=400, detail="Provide image files or a zip archive of images")
+
+    async def results():
+        started = time.perf_counter()
+        failed = 0
+        try:
+            batch = image_analyzer.aanalyze_batch(readers, decoder=partial(worker_pool.run, decode_detached))
+            async with aclosing(batch):
+                async for index, analysis in batch:
+                    failed += "error" in analysis
+                    yield json.dumps({"index": index, "filename": names[index], **analysis}, default=str) + "\n"
+            yield json.dumps({
+                "done": True, "images": len(readers), "failed": failed,
+                "elapsed": round(time.perf_counter() - started, 2),
+            }) + "\n"
+        finally:
+            close_archive()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 @app.post("/api/chat")
 async def chat(request: dict):
@@ -7,19 +7,26 @@ class Evidence(BaseModel):
     content: str
     url: str
 
+class TokenUsage(BaseModel):
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    estimated_prompt_tokens: int = 0
+
 class ScoreResponse(BaseModel):
     final_score: int = Field(..., ge=0, le=100)
     source_reliability: int = Field(..., ge=0, le=100)
     evidence_strength: int = Field(..., ge=0, le=100)
     consistency: int = Field(..., ge=0, le=100)
     verdict: Literal["VERIFIED", "FALSE", "MIXED", "UNVERIFIED"]
+    usage: Optional[TokenUsage] = None  # Set only when this response cost an LLM call
 
 class Claim(BaseModel):
     id: Optional[str] = None
     text: str
     source: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.now)
-    status: Literal["unverified", "verified", "processing"] = "unverified"
+    status: Literal["unverified", "verified", "false", "processing"] = "unverified"
     evidence: List[Evidence] = []
     score: Optional[ScoreResponse] = None
 
@@ -36,6 +43,7 @@ class CrisisResponse(BaseModel):
     crisis_detected: bool
     alerts: List[CrisisAlert]
     recommended_actions: List[str]
+    cursor: Optional[int] = None  # Pass back as ?cursor= to fetch only newer alerts
 
 class ExplainRequest(BaseModel):
     claim_text: str
@@ -55,3 +63,9 @@ class ScoreRequest(BaseModel):
     claim_id: Optional[str] = None
     claim_text: str
     evidence: List[Evidence]
+
+class ScoreBatchRequest(BaseModel):
+    items: List[ScoreRequest] = Field(..., min_length=1, max_length=100)
+
+class ScoreBatchResponse(BaseModel):
+    results: List[ScoreResponse]
@@ -0,0 +1,227 @@
+"""
+Prompt Building Module
+Token-budgeted prompts for the LLM agents. Static instructions live in a
+fixed prefix (sent as the model's system instruction so providers can cache
+it) and only the claim and its ranked, trimmed evidence vary per request.
+"""
+import os
+import re
+from typing import Dict, List, NamedTuple
+from models import Claim, Evidence, TokenUsage
+
+# Max estimated tokens for the per-request part of a prompt (claim + evidence)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+# Evidence content longer than this is cut before it is ranked into the budget
+EVIDENCE_MAX_CHARS = int(os.getenv("EVIDENCE_MAX_CHARS", "600"))
+
+SCORE_INSTRUCTIONS = """
+You are an expert fact-checker with advanced analytical reasoning. Your goal is to provide ACCURATE credibility assessment.
+
+CRITICAL: Read the evidence CAREFULLY before scoring. Do NOT rush to conclusions.
+
+STEP 1: UNDERSTAND THE CLAIM
+- What is the claim actually saying?
+- What would "true" look like? What would "false" look like?
+- What type of evidence would prove or disprove it?
+
+STEP 2: READ ALL EVIDENCE THOROUGHLY
+For EACH piece of evidence, ask:
+- Is this about the SAME topic as the claim?
+- Does this SUPPORT the claim, CONTRADICT it, or is it IRRELEVANT?
+- How RELIABLE is this source?
+
+STEP 3: DEEP ANALYSIS
+a) RELEVANCE CHECK: If the evidence is about something completely different → mark UNVERIFIED
+b) CONTENT ANALYSIS: What does each source actually SAY? Are there scientific facts, studies, or expert opinions?
+c) SOURCE RELIABILITY:
+   - Wikipedia, .edu, .gov, scientific journals, fact-checkers (Snopes, PolitiFact) = HIGH reliability (80-100)
+   - News outlets (BBC, Reuters, AP) = GOOD reliability (70-85)
+   - Blogs, unknown sites, social media = LOW reliability (0-40)
+d) EVIDENCE CONSISTENCY: Do all sources agree? Are there contradictions? How strong is the consensus?
+e) SCIENTIFIC BASIS: Is this a well-established fact or controversial?
+
+STEP 4: CROSS-VERIFY YOUR VERDICT
+- FALSE needs evidence that CONTRADICTS the claim
+- VERIFIED needs evidence that CONFIRMS the claim
+- MIXED needs BOTH supporting AND contradicting evidence
+- UNVERIFIED means the evidence is truly insufficient or irrelevant
+
+STEP 5: ASSIGN ACCURATE SCORES
+1. final_score: VERIFIED 75-95, FALSE 10-25, MIXED 40-60 (45 leaning false, 55 leaning true), UNVERIFIED 45-55
+2. source_reliability (0-100): fact-checkers, Wikipedia, .edu = 85-95; news sites = 70-80; blogs, unknown = 20-40
+3. evidence_strength (0-100): conclusive 80-95; moderate 50-70; weak/vague 20-40
+4. consistency (0-100): all agree 90-100; most agree 70-85; mixed 45-55; contradictory 20-40
+5. verdict: VERIFIED, FALSE, MIXED or UNVERIFIED
+
+VERIFICATION RULES:
+✓ If verdict = FALSE, final_score MUST be 10-25 (NOT 0)
+✓ If verdict = VERIFIED, final_score MUST be 75-95 (NOT 100)
+✓ Scores MUST align with verdict logic
+
+EXAMPLES:
+- "Earth is flat" / Wikipedia: Earth is an oblate spheroid → {"final_score": 18, "source_reliability": 92, "evidence_strength": 90, "consistency": 95, "verdict": "FALSE"}
+- "Coffee is healthy" / Study A: reduces diabetes risk; Study B: may increase anxiety → {"final_score": 55, "source_reliability": 75, "evidence_strength": 70, "consistency": 45, "verdict": "MIXED"}
+""".strip()
+
+EXPLAIN_INSTRUCTIONS = """
+You are an expert fact-checker. Based on a verification result, provide a clear, concise explanation
+(2-3 sentences) for the general public about why the claim received its verdict and score.
+Use simple language and answer in the requested language.
+""".strip()
+
+# Sources the scoring rubric already treats as reliable get ranked first
+RELIABLE_SOURCE_HINTS = (
+    "wikipedia.org", ".gov", ".edu", "snopes.com", "politifact.com", "factcheck.org",
+    "reuters.com", "apnews.com", "bbc.", "who.int", "nature.com", "fullfact.org",
+)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate tokens the way BPE tokenizers split text: punctuation is a token
+    and long words cost roughly one token per four characters.
+    """
+    return sum(max(1, (len(t) + 3) // 4) for t in _TOKEN_RE.findall(text))
+
+
+def _words(text: str) -> set:
+    return {w for w in re.findall(r"\w+", text.lower()) if len(w) > 2}
+
+
+def truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut + "..."
+
+
+def rank_evidence(claim_text: str, evidence: List[Evidence]) -> List[Evidence]:
+    """Order evidence by word overlap with the claim, boosted for reliable sources."""
+    claim_words = _words(claim_text)
+
+    def relevance(e: Evidence) -> float:
+        words = _words(f"{e.source} {e.content}")
+        overlap = len(claim_words & words) / (len(claim_words) or 1)
+        reliable = any(hint in e.url.lower() for hint in RELIABLE_SOURCE_HINTS)
+        # Fetch/search failures carry no information about the claim
+        failed = not e.url or e.content.startswith(("Failed to", "Error processing"))
+        return overlap + (0.5 if reliable else 0.0) - (1.0 if failed else 0.0)
+
+    return sorted(evidence, key=relevance, reverse=True)
+
+
+class BuiltPrompt(NamedTuple):
+    system: str
+    text: str
+    prompt_tokens: int
+    evidence_used: int
+    evidence_dropped: int
+
+
+class PromptBuilder:
+    """Builds agent prompts whose variable part stays inside a token budget."""
+
+    def __init__(self, budget: int = PROMPT_TOKEN_BUDGET, evidence_max_chars: int = EVIDENCE_MAX_CHARS):
+        self.budget = budget
+        self.evidence_max_chars = evidence_max_chars
+
+    def select_evidence(self, claim_text: str, evidence: List[Evidence], budget: int) -> List[str]:
+        """Return evidence lines, most relevant first, until the budget is spent (always at least one)."""
+        lines = []
+        spent = 0
+        for e in rank_evidence(claim_text, evidence):
+            line = f"- [{e.source}] {truncate(e.content, self.evidence_max_chars)} ({e.url})"
+            cost = count_tokens(line)
+            if lines and spent + cost > budget:
+                break
+            lines.append(line)
+            spent += cost
+        return lines
+
+    def score_prompt(self, claim: Claim) -> BuiltPrompt:
+        header = f'Claim to verify: "{claim.text}"\n\nEvidence provided:\n'
+        footer = (
+            "\n\nReturn ONLY a JSON object (no explanation):\n"
+            '{"final_score": <number>, "source_reliability": <number>, "evidence_strength": <number>, '
+            '"consistency": <number>, "verdict": "<string>"}'
+        )
+        budget = self.budget - count_tokens(header) - count_tokens(footer)
+        lines = self.select_evidence(claim.text, claim.evidence, budget)
+        text = header + "\n".join(lines) + footer
+        return self._built(SCORE_INSTRUCTIONS, text, len(lines), len(claim.evidence) - len(lines))
+
+    def batch_score_prompt(self, claims: List[Claim]) -> BuiltPrompt:
+        blocks = []
+        used = 0
+        dropped = 0
+        # Each claim gets its own budget so one evidence-heavy item can't starve the others
+        for i, claim in enumerate(claims):
+            lines = self.select_evidence(claim.text, claim.evidence, self.budget)
+            used += len(lines)
+            dropped += len(claim.evidence) - len(lines)
+            blocks.append(f'[{i}] Claim to verify: "{claim.text}"\nEvidence provided:\n' + "\n".join(lines))
+        text = (
+            "Assess each of the following INDEPENDENT claims. Judge each claim ONLY against its own evidence.\n\n"
+            + "\n\n".join(blocks)
+            + "\n\nReturn ONLY a JSON array with exactly one object per claim, using the claim number as \"id\" "
+            "(no explanation):\n"
+            '[{"id": <number>, "final_score": <number>, "source_reliability": <number>, '
+            '"evidence_strength": <number>, "consistency": <number>, "verdict": "<string>"}]'
+        )
+        return self._built(SCORE_INSTRUCTIONS, text, used, dropped)
+
+    def explain_prompt(self, result: Dict) -> BuiltPrompt:
+        text = (
+            f"Claim Verified: {truncate(str(result.get('claim', 'N/A')), self.evidence_max_chars)}\n"
+            f"Verdict: {result.get('verdict', 'UNVERIFIED')}\n"
+            f"Credibility Score: {result.get('score', 0)}/100\n"
+            f"Language: {result.get('lang', 'en')}"
+        )
+        return self._built(EXPLAIN_INSTRUCTIONS, text, 0, 0)
+
+    def _built(self, system: str, text: str, used: int, dropped: int) -> BuiltPrompt:
+        return BuiltPrompt(
+            system=system,
+            text=text,
+            prompt_tokens=count_tokens(system) + count_tokens(text),
+            evidence_used=used,
+            evidence_dropped=dropped,
+        )
+
+
+class UsageTracker:
+    """Running token totals for an agent, fed from each LLM response."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, response, built: BuiltPrompt) -> TokenUsage:
+        meta = getattr(response, "usage_metadata", None)
+        # Fall back to our own estimate when the provider doesn't report usage
+        usage = TokenUsage(
+            prompt_tokens=getattr(meta, "prompt_token_count", 0) or built.prompt_tokens,
+            completion_tokens=getattr(meta, "candidates_token_count", 0) or count_tokens(getattr(response, "text", "") or ""),
+            cached_tokens=getattr(meta, "cached_content_token_count", 0) or 0,
+            estimated_prompt_tokens=built.prompt_tokens,
+        )
+        self.requests += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        print(f"Token usage: prompt={usage.prompt_tokens} completion={usage.completion_tokens} "
+              f"cached={usage.cached_tokens} (evidence used={built.evidence_used}, dropped={built.evidence_dropped})")
+        return usage
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+        }
@@ -0,0 +1,99 @@
+"""
+Background Scheduling Module
+In-process asyncio scheduler that keeps the news cache warm, so category
+pages are served from memory instead of waiting on NewsData.
+"""
+import os
+import time
+import random
+import asyncio
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from agents import ScanAgent
+from cache import StaleWhileRevalidateCache
+
+NEWS_PREFETCH_INTERVAL = float(os.getenv("NEWS_PREFETCH_INTERVAL", "240"))
+NEWS_PREFETCH_CONCURRENCY = int(os.getenv("NEWS_PREFETCH_CONCURRENCY", "3"))
+NEWS_PREFETCH_JITTER = float(os.getenv("NEWS_PREFETCH_JITTER", "15"))
+NEWS_PREFETCH_MAX_BACKOFF = float(os.getenv("NEWS_PREFETCH_MAX_BACKOFF", "3600"))
+
+
+class CategoryPrefetcher:
+    """
+    Refreshes every news category on a fixed interval, at most `concurrency`
+    upstream calls at a time. Each round starts after a random jitter so
+    workers don't hit the API in lockstep, and a category that keeps failing
+    is retried with exponential backoff instead of every round.
+    """
+
+    def __init__(self, scan_agent: ScanAgent, cache: StaleWhileRevalidateCache,
+                 interval: float = NEWS_PREFETCH_INTERVAL, concurrency: int = NEWS_PREFETCH_CONCURRENCY,
+                 jitter: float = NEWS_PREFETCH_JITTER, max_backoff: float = NEWS_PREFETCH_MAX_BACKOFF):
+        self.scan_agent = scan_agent
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.refreshed = 0
+
+        # Several frontend categories share one NewsData category; fetch each once
+        self.categories: Dict[str, str] = {}
+        for category in scan_agent.category_mapping:
+            self.categories.setdefault(scan_agent.api_category(category), category)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        print(f"News prefetcher started: {len(self.categories)} categories every {self.interval:.0f}s")
+        while True:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            await self.refresh_all()
+            await asyncio.sleep(self.interval)
+
+    async def refresh_all(self):
+        self.rounds += 1
+        now = time.time()
+        due = [key for key in self.categories if self._retry_at.get(key, 0) <= now]
+        await asyncio.gather(*(self._refresh(key) for key in due))
+
+    async def _refresh(self, key: str):
+        category = self.categories[key]
+        async with self._semaphore:
+            try:
+                await self.cache.refresh(key, lambda: run_in_threadpool(self.scan_agent.fetch_category, category))
+                self.refreshed += 1
+                self._failures.pop(key, None)
+                self._retry_at.pop(key, None)
+            except Exception as e:
+                failures = self._failures.get(key, 0) + 1
+                self._failures[key] = failures
+                delay = min(self.max_backoff, self.interval * 2 ** failures)
+                self._retry_at[key] = time.time() + delay * random.uniform(0.8, 1.2)
+                print(f"WARNING: Prefetch of {category} failed ({failures}x), retrying in ~{delay:.0f}s: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "categories": len(self.categories),
+            "rounds": self.rounds,
+            "refreshed": self.refreshed,
+            "backing_off": {self.categories[k]: n for k, n in self._failures.items()},
+        }
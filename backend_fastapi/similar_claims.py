@@ -0,0 +1,221 @@
+"""
+Similar Claim Index
+Local index over previously scored claims, so paraphrases ("Earth is flat" /
+"the earth is actually flat") reuse the earlier verdict instead of running
+search and scoring again. No network or model is involved.
+
+Bag-of-features similarity can't tell "X increases risk" from "X decreases
+risk", "Pfizer..." from "Moderna...", or "Apple acquired Tesla" from "Tesla
+acquired Apple", so a verdict is reused only when both claims assert the same
+content words in the same order. Filler words, inflections, case and
+punctuation may differ. That makes a lookup an exact match on a fingerprint
+of the content words: one dict probe, however many claims are indexed.
+"""
+import os
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from cache import CACHE_DIR, normalize_text
+from models import ScoreResponse
+
+SIMILAR_CLAIM_INDEX_PATH = os.getenv("SIMILAR_CLAIM_INDEX_PATH", os.path.join(CACHE_DIR, "similar_claims.npz"))
+# Snapshot the index to disk after this many changes
+SIMILAR_CLAIM_SAVE_EVERY = int(os.getenv("SIMILAR_CLAIM_SAVE_EVERY", "200"))
+# Bumped whenever fingerprints change meaning; older snapshots are rebuilt
+INDEX_VERSION = 3
+
+# Only definitive verdicts are worth reusing; UNVERIFIED usually means no evidence was found
+REUSABLE_VERDICTS = ("VERIFIED", "FALSE", "MIXED")
+_SCORE_FIELDS = ("final_score", "source_reliability", "evidence_strength", "consistency")
+
+# Filler words that don't change what a claim asserts
+STOPWORDS = frozenset(
+    "a an the is are was were be been being am of to in on at by for with as that this these those "
+    "it its it s there actually really just very truly indeed so do does did has have had "
+    "say says said claim claims reportedly apparently definitely totally "
+    "completely literally basically".split()
+)
+_SUFFIXES = ("ing", "ed", "es", "s", "e")
+
+
+def stem(word: str) -> str:
+    """Strip one inflection so "causes", "caused", "causing" and "cause" agree."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_terms(text: str) -> List[str]:
+    """The claim's non-filler words, stemmed, in order."""
+    return [stem(word) for word in normalize_text(text).split() if word not in STOPWORDS]
+
+
+def fingerprint(text: str) -> Optional[int]:
+    """
+    64-bit hash of the claim's ordered content terms, None when it has none.
+    Every entity, number, negation and direction word is a content term, and
+    swapping two of them changes the order, so a differing fingerprint means a
+    different assertion. 64 bits keep accidental collisions negligible at
+    millions of claims, since a collision would hand out another claim's verdict.
+    """
+    terms = content_terms(text)
+    if not terms:
+        return None
+    digest = hashlib.blake2b(" ".join(terms).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class ClaimIndex:
+    """
+    Verdict index over scored claims: content fingerprint -> (claim id,
+    compact score). When two claims share a fingerprint the later one wins.
+
+    The index mirrors the claim store: claims the store compacts away are
+    removed, and snapshots record the store position they cover (`as_of`),
+    so a restart only re-indexes claims stored after the last snapshot.
+    """
+
+    def __init__(self, path: Optional[str] = SIMILAR_CLAIM_INDEX_PATH,
+                 as_of: Optional[Callable[[], int]] = None, save_every: int = SIMILAR_CLAIM_SAVE_EVERY):
+        self.path = path
+        self.as_of = as_of
+        self.save_every = save_every
+        self._unsaved = 0
+        self._save_lock = threading.Lock()
+        # fingerprint -> (claim id, score row); claim id -> fingerprint, for removal
+        self._claims: Dict[int, Tuple[str, bytes]] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._claims)
+
+    def add(self, claim_id: str, text: str, score: ScoreResponse) -> bool:
+        """Index a scored claim. Returns False when its verdict isn't reusable."""
+        added = self._add(claim_id, text, score)
+        if added:
+            self._changed(1)
+        return added
+
+    def _add(self, claim_id: str, text: str, score: ScoreResponse) -> bool:
+        if score.verdict not in REUSABLE_VERDICTS:
+            return False
+        key = fingerprint(text)
+        if key is None:
+            return False
+        row = bytes([getattr(score, field) for field in _SCORE_FIELDS] + [REUSABLE_VERDICTS.index(score.verdict)])
+        with self._lock:
+            self._put(key, claim_id, row)
+        return True
+
+    def _put(self, key: int, claim_id: str, row: bytes):
+        replaced = self._claims.get(key)
+        if replaced:
+            self._fingerprints.pop(replaced[0], None)
+        self._claims[key] = (claim_id, row)
+        self._fingerprints[claim_id] = key
+
+    def remove(self, claim_ids: Iterable[str]) -> int:
+        """Drop claims, e.g. the ones the claim store compacted away. Returns claims removed."""
+        removed = 0
+        with self._lock:
+            for claim_id in claim_ids:
+                key = self._fingerprints.pop(claim_id, None)
+                if key is not None:
+                    del self._claims[key]
+                    removed += 1
+        if removed:
+            self._changed(removed)
+        return removed
+
+    def _changed(self, rows: int):
+        self._unsaved += rows
+        if self.save_every and self._unsaved >= self.save_every:
+            self.save()
+
+    def search(self, text: str) -> Optional[Dict]:
+        """
+        The indexed claim asserting the same content as `text`, as
+        {"claim_id", "score"}; None if there is none.
+        """
+        key = fingerprint(text)
+        with self._lock:
+            entry = self._claims.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        claim_id, row = entry
+        score = dict(zip(_SCORE_FIELDS, row[:-1]))
+        score["verdict"] = REUSABLE_VERDICTS[row[-1]]
+        return {"claim_id": claim_id, "score": ScoreResponse(**score)}
+
+    def rebuild(self, claims: Iterable):
+        """
+        Index every claim that carries a score and isn't indexed yet, e.g.
+        from the claim store after a restart.
+        """
+        added = 0
+        for claim in claims:
+            if claim.score and claim.id and claim.id not in self._fingerprints:
+                added += self._add(claim.id, claim.text, claim.score)
+        # One snapshot for the whole batch rather than one every save_every rows
+        if added:
+            self._changed(max(added, self.save_every))
+        return added
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Read the store position first: anything stored after it is re-indexed on load
+        as_of = self.as_of() if self.as_of else 0
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._claims.items())
+                self._unsaved = 0
+            arrays = {
+                "fingerprints": np.fromiter((key for key, _ in entries), dtype=np.uint64, count=len(entries)),
+                "ids": np.array([claim_id for _, (claim_id, _) in entries], dtype=str),
+                "scores": np.frombuffer(b"".join(row for _, (_, row) in entries), dtype=np.uint8)
+                .reshape(len(entries), len(_SCORE_FIELDS) + 1),
+            }
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, version=INDEX_VERSION, as_of=as_of, **arrays)
+            os.replace(tmp, path)
+
+    def load(self, path: Optional[str] = None) -> Optional[int]:
+        """
+        Load a saved index and return the claim store position it covers.
+        None when there is none, or it was saved by another version and has
+        to be rebuilt.
+        """
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if "version" not in data or int(data["version"]) != INDEX_VERSION:
+                    return None
+                keys, ids, scores = data["fingerprints"].tolist(), data["ids"].tolist(), data["scores"]
+                with self._lock:
+                    self._claims.clear()
+                    self._fingerprints.clear()
+                    for key, claim_id, row in zip(keys, ids, scores):
+                        self._put(key, claim_id, row.tobytes())
+                return int(data["as_of"])
+        except Exception as e:
+            print(f"WARNING: Could not load claim index {path}: {e}")
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            "claims": len(self._claims),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
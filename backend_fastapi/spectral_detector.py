@@ -0,0 +1,149 @@
+"""
+Spectral AI-Image Detector
+Local, NumPy-only scoring of generator artifacts, used when the remote model
+is unavailable, as an offline mode, or as a pre-filter in front of it.
+Works on a native-resolution grayscale crop, since any resampling would
+erase the evidence, split into tiles and analysed in one batched FFT:
+
+- periodic peaks in the spectrum of the pixel-difference magnitude, which
+  upsampling and transposed-convolution layers leave at periods of 2 and
+  4 pixels (JPEG's 8-pixel grid is measured separately and discounted);
+- how much broadband sensor noise the image carries, and how much of the
+  residual's energy sits in the highest frequencies.
+
+Any upscaled image carries the same periodic traces, so an enlarged photo
+scores like a generator output; `without_resampling` is the score with the
+periodic evidence left out, for decisions that must not rest on it alone.
+A hand-tuned heuristic, not a trained classifier: treat it as a weak
+signal and keep confidence low.
+"""
+import os
+import io
+import math
+import time
+from typing import BinaryIO, Dict, NamedTuple, Optional, Union
+import numpy as np
+from PIL import Image
+
+# Side of the centre crop analysed, and the largest image worth decoding at full size for it
+SPECTRAL_CROP = int(os.getenv("SPECTRAL_CROP", "512"))
+SPECTRAL_MAX_PIXELS = int(os.getenv("SPECTRAL_MAX_PIXELS", str(40_000_000)))
+TILE = 64
+
+_N = TILE
+_HANN = np.outer(np.hanning(_N), np.hanning(_N)).astype(np.float32)
+_FY = np.fft.fftfreq(_N)[:, None] * 2  # In units of Nyquist
+_FX = np.fft.rfftfreq(_N)[None, :] * 2
+_RHO = np.sqrt(_FY ** 2 + _FX ** 2)
+_HIGH_BAND = _RHO > 0.7
+_MID_BAND = (_RHO > 0.2) & (_RHO <= 0.45)
+# (row, col) bins in the rfft2 layout: resampling periods 2 and 4, and JPEG's odd 8-pixel harmonics
+_RESAMPLING_PEAKS = [(_N // 2, 0), (0, _N // 2), (_N // 2, _N // 2),
+                     (_N // 4, 0), (0, _N // 4), (_N // 4, _N // 4), (3 * _N // 4, _N // 4)]
+_JPEG_PEAKS = [(_N // 8, 0), (0, _N // 8), (3 * _N // 8, 0), (0, 3 * _N // 8)]
+
+# Logistic weights, checked on the camera photos in fixtures/spectral and the synthetic set in
+# bench_spectral_detector.py. hf_ratio separates the synthetic classes but not real photos, whose
+# top band JPEG compression removes, so it is reported and not scored.
+_WEIGHTS = {"periodic": 2.0, "noise": -0.5, "hf_ratio": 0.0}
+_BIAS = -1.1
+# Beyond a typical sensor's levels, more noise or high-frequency energy is no evidence of a camera
+_NOISE_CAP = 4.0
+_HF_RATIO_CAP = 1.0
+
+
+class SpectralFeatures(NamedTuple):
+    periodic: float  # Strongest resampling peak over its surroundings, less the JPEG grid's (log power)
+    jpeg_grid: float  # Strongest odd 8-pixel harmonic above its surroundings (log power)
+    noise: float  # Estimated sensor noise, in gray levels
+    hf_ratio: float  # Residual power above 0.7 Nyquist relative to 0.2-0.45 Nyquist (log)
+    tiles: int
+
+
+def native_crop(source: Union[bytes, BinaryIO], size: int = SPECTRAL_CROP) -> Optional[np.ndarray]:
+    """
+    Decode `source` at full resolution, luma only, and return its centre
+    `size` x `size` crop as float32. None when the image is too large to
+    decode cheaply or too small to tile.
+    """
+    if not isinstance(source, (bytes, bytearray)):
+        source.seek(0)
+    image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    width, height = image.size
+    if width * height > SPECTRAL_MAX_PIXELS or min(width, height) < 2 * TILE:
+        return None
+    # Decode the JPEG luma plane only, skipping chroma upsampling and colour conversion
+    image.draft("L", image.size)
+    gray = image.convert("L")
+    cw, ch = min(size, width), min(size, height)
+    left, top = (width - cw) // 2, (height - ch) // 2
+    return np.asarray(gray.crop((left, top, left + cw, top + ch)), dtype=np.float32)
+
+
+def center_crop(gray: np.ndarray, size: int = SPECTRAL_CROP) -> np.ndarray:
+    """Centre `size` x `size` crop of an already decoded grayscale array."""
+    height, width = gray.shape
+    top, left = max(0, (height - size) // 2), max(0, (width - size) // 2)
+    return gray[top:top + size, left:left + size]
+
+
+def _tiles(array: np.ndarray) -> np.ndarray:
+    rows, cols = array.shape[0] // _N, array.shape[1] // _N
+    tiles = array[:rows * _N, :cols * _N].reshape(rows, _N, cols, _N).swapaxes(1, 2).reshape(-1, _N, _N)
+    return tiles - tiles.mean(axis=(1, 2), keepdims=True)
+
+
+def _power(tiles: np.ndarray) -> np.ndarray:
+    """Mean windowed power spectrum over all tiles, in one batched FFT."""
+    return (np.abs(np.fft.rfft2(tiles * _HANN)) ** 2).mean(axis=0)
+
+
+def _peak(log_power: np.ndarray, row: int, col: int) -> float:
+    """Height of one bin over the median of its 5x5 neighbourhood."""
+    rows = np.arange(row - 2, row + 3) % _N
+    cols = np.clip(np.arange(col - 2, col + 3), 0, log_power.shape[1] - 1)
+    window = log_power[np.ix_(rows, cols)].ravel()
+    return float(log_power[row, col] - np.median(np.delete(window, 12)))
+
+
+def extract_features(gray: np.ndarray) -> SpectralFeatures:
+    # Interpolated pixels are predictable from their neighbours, so the size of
+    # the step to the next pixel pulses with the upsampling period
+    steps = np.abs(gray[1:, 1:] - gray[1:, :-1]) + np.abs(gray[1:, 1:] - gray[:-1, 1:])
+    magnitude = np.log(_power(_tiles(steps)) + 1e-6)
+    periodic = max(_peak(magnitude, r, c) for r, c in _RESAMPLING_PEAKS)
+    jpeg_grid = max(_peak(magnitude, r, c) for r, c in _JPEG_PEAKS)
+
+    # Laplacian residual: removes scene content, keeps sensor noise
+    residual = 4 * gray[1:-1, 1:-1] - gray[:-2, 1:-1] - gray[2:, 1:-1] - gray[1:-1, :-2] - gray[1:-1, 2:]
+    tiles = _tiles(residual)
+    power = _power(tiles)
+    hf_ratio = math.log((power[_HIGH_BAND].mean() + 1e-6) / (power[_MID_BAND].mean() + 1e-6))
+
+    # Robust noise estimate per tile (MAD of a Laplacian of white noise is 0.6745 * sqrt(20) sigma);
+    # the quietest quarter of tiles approximates the noise floor without texture
+    per_tile = np.median(np.abs(tiles), axis=(1, 2)) / (0.6745 * math.sqrt(20))
+    noise = float(np.percentile(per_tile, 25))
+
+    return SpectralFeatures(max(0.0, periodic - max(0.0, jpeg_grid)), jpeg_grid, noise, hf_ratio, len(tiles))
+
+
+def ai_probability(features: SpectralFeatures, resampling: bool = True) -> float:
+    """Logistic score; `resampling=False` leaves out the periodic peaks that any upscaling leaves."""
+    z = (_BIAS
+         + (_WEIGHTS["periodic"] * features.periodic if resampling else 0.0)
+         + _WEIGHTS["noise"] * math.log1p(min(features.noise, _NOISE_CAP))
+         + _WEIGHTS["hf_ratio"] * min(features.hf_ratio, _HF_RATIO_CAP))
+    return 1 / (1 + math.exp(-z))
+
+
+def detect(gray: np.ndarray) -> Dict:
+    """Score a grayscale crop; returns the probability and the features behind it."""
+    started = time.perf_counter()
+    features = extract_features(gray)
+    return {
+        "ai_probability": ai_probability(features),
+        "without_resampling": ai_probability(features, resampling=False),
+        "features": {name: round(float(value), 4) for name, value in features._asdict().items()},
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
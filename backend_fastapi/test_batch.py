@@ -0,0 +1,83 @@
+"""/api/images/analyze-batch: NDJSON results, and archives closed on rejection."""
+import io
+import json
+import zipfile
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+import main
+
+
+def png(seed: int) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def archive(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_results_stream_then_done(client):
+    files = [("files", ("a.png", png(1), "image/png")),
+             ("archive", ("album.zip", archive({"b.png": png(2), "notes.txt": b"skip me"}), "application/zip"))]
+    response = client.post(main.BATCH_ANALYZE_PATH, files=files)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((line["index"], line["filename"]) for line in lines[:-1]) == [(0, "a.png"), (1, "b.png")]
+    assert lines[-1]["done"] is True and lines[-1]["images"] == 2
+
+
+def test_too_many_images_closes_the_archive(client, monkeypatch):
+    opened = []
+
+    class RecordingZipFile(zipfile.ZipFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    spools = []
+    spool_upload = main.spool_upload
+
+    async def recording_spool(*args, **kwargs):
+        spools.append(await spool_upload(*args, **kwargs))
+        return spools[-1]
+
+    monkeypatch.setattr(main, "BATCH_MAX_IMAGES", 2)
+    monkeypatch.setattr(main.zipfile, "ZipFile", RecordingZipFile)
+    monkeypatch.setattr(main, "spool_upload", recording_spool)
+    files = [("files", ("a.png", png(1), "image/png")),
+             ("archive", ("album.zip", archive({"b.png": png(2), "c.png": png(3)}), "application/zip"))]
+    response = client.post(main.BATCH_ANALYZE_PATH, files=files)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 2 images per batch, got 3"
+    assert opened and opened[0].fp is None
+    assert spools and spools[0].file.closed
+
+
+def test_files_filling_the_quota_reject_the_archive_unopened(client, monkeypatch):
+    async def spool_upload(*args, **kwargs):
+        raise AssertionError("archive spooled with no quota left")
+
+    monkeypatch.setattr(main, "BATCH_MAX_IMAGES", 1)
+    monkeypatch.setattr(main, "spool_upload", spool_upload)
+    files = [("files", ("a.png", png(1), "image/png")),
+             ("archive", ("album.zip", archive({"b.png": png(2)}), "application/zip"))]
+    response = client.post(main.BATCH_ANALYZE_PATH, files=files)
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 1 images per batch, and the 1 files leave no room for an archive"
+
+    files = [("files", ("a.png", png(1), "image/png")), ("files", ("b.png", png(2), "image/png"))]
+    response = client.post(main.BATCH_ANALYZE_PATH, files=files)
+    assert response.json()["detail"] == "At most 1 images per batch, got 2"
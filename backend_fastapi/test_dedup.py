@@ -0,0 +1,67 @@
+"""Headline clustering: syndicated copies fold, different stories never do."""
+import pytest
+import main
+from agents import ScanAgent
+from dedup import HeadlineClusterer, normalize_headline
+from models import Claim, Evidence
+
+DIFFERENT_STORIES = [
+    ("Biden wins Michigan primary", "Trump wins Michigan primary"),
+    ("Stocks rise as Fed holds rates steady", "Stocks fall as Fed holds rates steady"),
+    ("5 killed in shooting in Texas", "3 killed in shooting in Ohio"),
+    ("Senate passes bill", "House passes bill"),
+]
+
+
+def news_claim(text: str, source: str = "reuters") -> Claim:
+    return Claim(text=text, source=source, evidence=[Evidence(source=source, content=text, url=f"https://{source}/{hash(text)}")])
+
+
+@pytest.mark.parametrize("first, second", DIFFERENT_STORIES)
+def test_different_stories_stay_apart(first, second):
+    clusterer = HeadlineClusterer()
+    assert clusterer.assign(normalize_headline(first), "a") is None
+    assert clusterer.assign(normalize_headline(second), "b") is None
+
+
+def test_syndicated_copies_fold():
+    clusterer = HeadlineClusterer()
+    clusterer.assign(normalize_headline("Magnitude 7.1 earthquake strikes off northern Japan - Reuters"), "a")
+    assert clusterer.assign(normalize_headline("Magnitude 7.1 earthquake strikes off northern Japan | AP News"), "b") == "a"
+
+
+def test_user_claims_are_not_cluster_seeds():
+    agent = ScanAgent()
+    agent.remember([Claim(id="user-1", text="Trump wins Michigan primary")])
+    new_claims, merges = agent.dedupe_known([news_claim("Trump wins Michigan primary")])
+    assert len(new_claims) == 1 and not merges
+
+
+def test_folded_headlines_reach_the_crisis_agent(monkeypatch):
+    first = news_claim("Explosion at chemical plant in Houston - Reuters", "reuters")
+    copy = news_claim("Explosion at chemical plant in Houston | AP", "ap")
+    main.scan_agent.remember([main.claim_store.add(first)])
+    monkeypatch.setattr(main.scan_agent, "scan", lambda source_url=None: [copy])
+    ingested = []
+    monkeypatch.setattr(main.crisis_agent, "ingest", lambda claims: ingested.extend(claims))
+
+    main.background_scan(None)
+
+    assert [c.id for c in ingested] == [copy.id]
+    assert {e.source for e in main.claim_store.get(first.id).evidence} == {"reuters", "ap"}
+
+
+def test_sources_shared_by_folded_copies_are_merged_once(monkeypatch):
+    first = news_claim("Bridge collapse closes river crossing in Pittsburgh - Reuters", "reuters")
+    copies = [news_claim(f"Bridge collapse closes river crossing in Pittsburgh | {outlet}", "ap")
+              for outlet in ("AP", "AP News")]
+    for copy in copies:
+        copy.evidence[0].url = "https://ap/bridge-collapse"
+    main.scan_agent.remember([main.claim_store.add(first)])
+    monkeypatch.setattr(main.scan_agent, "scan", lambda source_url=None: copies)
+    monkeypatch.setattr(main.crisis_agent, "ingest", lambda claims: None)
+
+    main.background_scan(None)
+
+    urls = [e.url for e in main.claim_store.get(first.id).evidence]
+    assert sorted(urls) == sorted([first.evidence[0].url, "https://ap/bridge-collapse"])
@@ -0,0 +1,87 @@
+"""
+Forensic scoring: clean single-compressed JPEGs stay below MODERATE RISK,
+and a clone or double compression still raises the score.
+"""
+import io
+import os
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+import main
+from bench_forensics import make_jpeg
+from bench_spectral_detector import scene
+from forensics import analyze_image_bytes
+
+PHOTO = os.path.join(os.path.dirname(__file__), "fixtures", "spectral", "real", "discovery.jpg")
+
+
+def jpeg(array: np.ndarray, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(array, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def decode(data: bytes) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"), dtype=np.float32)
+
+
+def noisy_gradient(seed: int = 1) -> np.ndarray:
+    y, x = np.mgrid[0:768, 0:1024]
+    gradient = np.stack([x / 1024 * 200 + 20, y / 768 * 200 + 20, (x + y) / 1792 * 200 + 20], axis=-1)
+    return gradient + np.random.default_rng(seed).normal(0, 6, gradient.shape)
+
+
+def noisy_scene(seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = scene(768, 1024, rng)
+    return image + rng.normal(0, 1, image.shape) * np.sqrt(2 + image * 0.03)
+
+
+CLEAN = {
+    "gradient-q90": lambda: jpeg(noisy_gradient()),
+    "gradient-q75": lambda: jpeg(noisy_gradient(), 75),
+    "scene-q85": lambda: jpeg(noisy_scene(), 85),
+    "scene-q90": lambda: jpeg(noisy_scene(), 90),
+    "bench-q92": lambda: make_jpeg(1152, 864, 0),
+    "photo": lambda: open(PHOTO, "rb").read(),
+}
+
+
+@pytest.mark.parametrize("name", CLEAN)
+def test_clean_single_compressed_jpeg_is_below_moderate(name):
+    report = analyze_image_bytes(CLEAN[name]())
+    assert report["recommendation"] == "LIKELY AUTHENTIC", report["technicalDetails"]
+    assert report["technicalDetails"]["compressionAnomalies"] == 0
+
+
+def test_copy_move_is_high_risk():
+    image = decode(jpeg(noisy_scene(), 92))
+    image[400:560, 600:760] = image[100:260, 100:260]
+    report = analyze_image_bytes(jpeg(image, 92))
+    assert report["recommendation"] == "HIGH RISK"
+    assert report["checks"]["copy_move"]["shift"] == [500, 300]
+
+
+def test_double_compression_is_flagged():
+    report = analyze_image_bytes(jpeg(decode(jpeg(noisy_scene(), 60)), 90))
+    assert report["technicalDetails"]["compressionAnomalies"] == 100
+    assert report["recommendation"] == "MODERATE RISK"
+
+
+def test_unreadable_upload_is_415_without_internals():
+    response = TestClient(main.app).post("/api/forensics", files={"file": ("a.jpg", b"not an image", "image/jpeg")})
+    assert response.status_code == 415
+    assert response.json()["detail"] == "Unsupported or unreadable image"
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG"])
+def test_image_smaller_than_a_block_gets_a_metadata_only_report(fmt):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), (120, 30, 40)).save(buffer, format=fmt)
+    response = TestClient(main.app).post("/api/forensics", files={"file": ("tiny", buffer.getvalue(), "image/" + fmt.lower())})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["checks"]["ela"] is None and report["checks"]["copy_move"] is None
+    assert report["manipulations"][0].startswith("Image too small (4x4)")
+    assert report["recommendation"] == "LIKELY AUTHENTIC"
@@ -0,0 +1,68 @@
+"""HostLimitedTransport per-host caps, against an in-memory transport."""
+import asyncio
+import httpx
+from http_clients import HostLimitedTransport
+
+
+class Body(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b"ok"
+
+
+def ok(request):
+    # A streamed body, like a real connection; content= responses count as already closed
+    return httpx.Response(200, stream=Body())
+
+
+def test_semaphores_are_bounded_to_recent_hosts():
+    transport = HostLimitedTransport(httpx.MockTransport(ok), max_per_host=2, max_hosts=3)
+
+    async def fetch_all():
+        async with httpx.AsyncClient(transport=transport) as client:
+            for i in range(10):
+                await client.get(f"https://site{i}.example/")
+            await client.get("https://site7.example/")
+            await client.get("https://site10.example/")
+
+    asyncio.run(fetch_all())
+    assert list(transport._semaphores) == [b"site9.example", b"site7.example", b"site10.example"]
+
+
+def test_host_slot_is_held_until_the_body_is_closed():
+    transport = HostLimitedTransport(httpx.MockTransport(ok), max_per_host=1)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            request = client.build_request("GET", "https://slow.example/")
+            first = await client.send(request, stream=True)
+            second = asyncio.ensure_future(client.get("https://slow.example/"))
+            await asyncio.sleep(0.05)
+            waiting = not second.done()
+            await first.aclose()
+            return waiting, (await second).status_code
+
+    assert asyncio.run(run()) == (True, 200)
+
+
+def test_busy_hosts_keep_their_semaphore():
+    transport = HostLimitedTransport(httpx.MockTransport(ok), max_per_host=1, max_hosts=1)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            held = await client.send(client.build_request("GET", "https://busy.example/"), stream=True)
+            # A newer host would evict busy.example's semaphore if it were idle
+            await client.get("https://other.example/")
+            hosts_while_busy = list(transport._semaphores)
+            second = asyncio.ensure_future(client.get("https://busy.example/"))
+            await asyncio.sleep(0.05)
+            capped = not second.done()
+            await held.aclose()
+            await second
+            # Once idle, both older hosts make way for the next new one
+            await client.get("https://third.example/")
+            return capped, hosts_while_busy, list(transport._semaphores)
+
+    capped, hosts_while_busy, hosts_after = asyncio.run(run())
+    assert capped
+    assert hosts_while_busy == [b"busy.example", b"other.example"]
+    assert hosts_after == [b"third.example"]
@@ -0,0 +1,39 @@
+"""ImageResultCache perceptual-hash tier: near copies hit, distant hashes miss."""
+import random
+from cache import ImageResultCache
+
+PHASH = 0xF0F0_1234_ABCD_8001
+
+
+def test_near_copy_hits_with_its_distance(tmp_path):
+    cache = ImageResultCache(path=str(tmp_path / "images.db"), max_distance=4)
+    cache.set("a" * 64, PHASH, {"verdict": "Likely Real"})
+    value, distance = cache.get_similar(PHASH ^ 0b1011)
+    assert value == {"verdict": "Likely Real"}
+    assert distance == 3
+
+
+def test_distant_hash_misses(tmp_path):
+    cache = ImageResultCache(path=str(tmp_path / "images.db"), max_distance=4)
+    cache.set("a" * 64, PHASH, {"verdict": "Likely Real"})
+    assert cache.get_similar(PHASH ^ 0b11111) is None
+    assert cache.misses == 1
+
+
+def test_bucketed_lookup_agrees_with_a_full_scan(tmp_path):
+    rng = random.Random(7)
+    cache = ImageResultCache(path=str(tmp_path / "images.db"), max_size=300, max_distance=7)
+    stored = {}
+    for i in range(400):
+        phash = rng.getrandbits(64) if i % 4 else PHASH ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        cache.set(f"{i:064x}", phash, {"i": i})
+        stored[f"{i:064x}"] = phash
+    # The 100 oldest entries were evicted and must not come back as near matches
+    live = {sha: phash for sha, phash in stored.items() if cache.get(sha) is not None}
+    assert len(live) == 300 and cache._phashes == live
+
+    for _ in range(50):
+        query = PHASH ^ rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        best = min((bin(query ^ phash).count("1") for phash in live.values()), default=99)
+        match = cache.get_similar(query)
+        assert (match[1] if match else None) == (best if best <= 7 else None)
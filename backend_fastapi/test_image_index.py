@@ -0,0 +1,13 @@
+"""ImageIndex reverse search by perceptual-hash distance."""
+from image_index import ImageIndex
+
+PHASH = 0xF0F0_1234_ABCD_8001
+
+
+def test_search_orders_by_distance(tmp_path):
+    index = ImageIndex(path=str(tmp_path / "index.db"), max_distance=8)
+    index.add(PHASH ^ 0b111, "b" * 64, source="wire")
+    index.add(PHASH, "a" * 64, source="archive")
+    index.add(PHASH ^ 0xFFFF, "c" * 64)
+    matches = index.search(PHASH)
+    assert [(m["sha256"][0], m["distance"]) for m in matches] == [("a", 0), ("b", 3)]
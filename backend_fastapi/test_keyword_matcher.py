@@ -0,0 +1,26 @@
+"""Crisis keyword matching: word boundaries hold, derived forms still match."""
+from agents import crisis_matcher
+
+
+def test_derived_forms_match_their_keyword():
+    assert crisis_matcher.find("Russian forces shell Kharkiv") == ["russia"]
+    assert crisis_matcher.find("Israeli cabinet meets overnight") == ["israel"]
+    assert crisis_matcher.find("Gunman opens fire at mall") == ["gun", "fire"]
+    assert crisis_matcher.find("Gunfire heard downtown") == ["gun"]
+
+
+def test_inflections_match():
+    assert crisis_matcher.find("Two attacks reported; storms flooding roads") == ["attack", "storm", "flood"]
+    assert crisis_matcher.find("Wildfires spread as fires reach the war zone") == ["wildfire", "fire", "war"]
+
+
+def test_substrings_inside_other_words_do_not_match():
+    assert crisis_matcher.find("Actor wins award at the theater") == []
+    assert crisis_matcher.match("Begun: the gunny sack festival") is None
+
+
+def test_look_alike_words_do_not_match():
+    assert crisis_matcher.find("Patients moved to a new hospital ward") == []
+    assert crisis_matcher.find("Street vendors sell their wares") == []
+    assert crisis_matcher.find("Home heating bills climb") == []
+    assert crisis_matcher.find("Bank CEO fired after audit") == []
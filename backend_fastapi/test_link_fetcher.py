@@ -0,0 +1,65 @@
+"""
+LinkFetcher with a cache: fresh entries skip the request, stale ones are
+revalidated, and the SQLite cache is only touched off the event loop.
+"""
+import asyncio
+import threading
+import httpx
+from cache import HttpContentCache
+from link_fetcher import LinkFetcher
+
+PAGE = b"<html><head><title>Harbour bridge</title></head><body><p>It opened in 1932.</p></body></html>"
+
+
+class ThreadRecordingCache(HttpContentCache):
+    """Remembers which thread each cache call ran on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, *args):
+        self.threads.append(("get", threading.get_ident()))
+        return super().get(*args)
+
+    def set(self, *args):
+        self.threads.append(("set", threading.get_ident()))
+        return super().set(*args)
+
+    def revalidated(self, *args):
+        self.threads.append(("revalidated", threading.get_ident()))
+        return super().revalidated(*args)
+
+    def delete(self, *args):
+        self.threads.append(("delete", threading.get_ident()))
+        return super().delete(*args)
+
+
+def respond(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/uncacheable":
+        return httpx.Response(200, headers={"content-type": "text/html", "cache-control": "no-store"}, content=PAGE)
+    if request.headers.get("if-none-match") == '"v1"':
+        return httpx.Response(304, headers={"cache-control": "max-age=0"})
+    return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"', "cache-control": "max-age=0"},
+                          content=PAGE)
+
+
+def test_cache_calls_run_off_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(path=str(tmp_path / "links.db"))
+    fetcher = LinkFetcher(cache=cache)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(respond)) as client:
+            first = await fetcher.fetch("https://example.org/page", client)
+            second = await fetcher.fetch("https://example.org/page", client)
+            # Cached once, then served uncacheable: the stale entry is dropped
+            cache.set("https://example.org/uncacheable", {"title": "", "text": "", "content_type": "text/html",
+                                                           "truncated": False}, 0.0, '"v0"')
+            await fetcher.fetch("https://example.org/uncacheable", client)
+            return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run())
+    assert first.title == second.title == "Harbour bridge"
+    assert (fetcher.downloads, fetcher.revalidated) == (2, 1)
+    calls = [name for name, thread in cache.threads if thread != loop_thread]
+    assert calls == ["get", "set", "get", "revalidated", "get", "delete"]
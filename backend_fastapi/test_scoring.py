@@ -0,0 +1,118 @@
+"""
+ScoreAgent.score_many against a scripted model: only unparseable verdicts
+are retried, and an API error stops the batch instead of multiplying calls.
+ScoreAgent.ascore keeps the SQLite verdict cache off the event loop.
+"""
+import asyncio
+import json
+import threading
+from typing import List
+import pytest
+from agents import ScoreAgent
+from cache import VerdictCache
+from models import Claim, Evidence
+
+VERDICT = {"final_score": 20, "source_reliability": 80, "evidence_strength": 70, "consistency": 90, "verdict": "FALSE"}
+
+
+class Reply:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class ScriptedModel:
+    """Answers each generate_content call with the next scripted reply or exception."""
+
+    def __init__(self, replies: List):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return Reply(reply)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return self.generate_content(prompt, **kwargs)
+
+
+class ThreadRecordingVerdictCache(VerdictCache):
+    """Remembers which thread each cache call ran on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().get(*args)
+
+    def set(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().set(*args)
+
+
+def make_claims(count: int) -> List[Claim]:
+    evidence = [Evidence(source="Fact check", content="A detailed fact-check of this claim.", url="https://example.org")]
+    return [Claim(id=str(i), text=f"Claim number {i} about the harbour bridge", evidence=evidence)
+            for i in range(count)]
+
+
+@pytest.fixture
+def agent(tmp_path):
+    return ScoreAgent(verdict_cache=VerdictCache(path=str(tmp_path / "verdicts.db")))
+
+
+def test_only_unparsed_items_are_retried(agent):
+    # Item 2 is missing from the batch answer; it alone gets a second call
+    batch = [dict(VERDICT, id=i) for i in (0, 1, 3)]
+    agent.model = ScriptedModel([json.dumps(batch), json.dumps(dict(VERDICT, verdict="MIXED"))])
+    results = agent.score_many(make_claims(4))
+    assert len(agent.model.prompts) == 2
+    assert [r.verdict for r in results] == ["FALSE", "FALSE", "MIXED", "FALSE"]
+
+
+def test_unparseable_batch_is_split(agent):
+    # Nothing parsed: halve, and each half of one is scored on its own
+    agent.model = ScriptedModel(["not json", json.dumps(VERDICT), json.dumps(VERDICT)])
+    results = agent.score_many(make_claims(2))
+    assert len(agent.model.prompts) == 3
+    assert all(r.verdict == "FALSE" for r in results)
+
+
+def test_api_error_fails_fast(agent):
+    agent.model = ScriptedModel([RuntimeError("429 Resource has been exhausted")])
+    results = agent.score_many(make_claims(20))
+    assert len(agent.model.prompts) == 1
+    assert all(r.verdict == "UNVERIFIED" for r in results)
+
+
+def test_ascore_uses_the_verdict_cache_off_the_event_loop(tmp_path):
+    agent = ScoreAgent(verdict_cache=ThreadRecordingVerdictCache(path=str(tmp_path / "verdicts.db")))
+    agent.model = ScriptedModel([json.dumps(VERDICT)])
+    claim = make_claims(1)[0]
+
+    async def run():
+        return [await agent.ascore(claim) for _ in range(2)], threading.get_ident()
+
+    results, loop_thread = asyncio.run(run())
+    # The second call is a cache hit: one model call, get/set/get on worker threads
+    assert len(agent.model.prompts) == 1
+    assert [r.verdict for r in results] == ["FALSE", "FALSE"]
+    assert len(agent.verdict_cache.threads) == 3
+    assert loop_thread not in agent.verdict_cache.threads
+
+
+def test_score_and_ascore_share_cache_and_failure_handling(agent):
+    claims = make_claims(2)
+    agent.model = ScriptedModel([json.dumps(VERDICT), "not json", RuntimeError("503 Service unavailable")])
+    assert agent.score(claims[0]).verdict == "FALSE"
+    # Cached by the sync path, so the async one answers without calling the model
+    assert asyncio.run(agent.ascore(claims[0])).verdict == "FALSE"
+    assert len(agent.model.prompts) == 1
+    assert asyncio.run(agent.ascore(claims[1])).verdict == "UNVERIFIED"
+    assert agent.score(claims[1]).verdict == "UNVERIFIED"
+    assert len(agent.model.prompts) == 3
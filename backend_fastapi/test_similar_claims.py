@@ -0,0 +1,94 @@
+"""Verdict reuse: paraphrases match, claims that assert something else never do."""
+import pytest
+from claim_store import ClaimStore
+from models import Claim, ScoreResponse
+from similar_claims import ClaimIndex
+
+FALSE = ScoreResponse(final_score=10, source_reliability=80, evidence_strength=80, consistency=90, verdict="FALSE")
+
+DIFFERENT_CLAIMS = [
+    ("Eating red meat increases risk of heart disease", "Eating red meat decreases risk of heart disease"),
+    ("Emmanuel Macron is the president of France", "Emmanuel Macron is the president of Germany"),
+    ("Pfizer vaccine causes infertility", "Moderna vaccine causes infertility"),
+    ("Apple acquired Tesla", "Tesla acquired Apple"),
+    ("The earth is flat", "The earth is not flat"),
+    ("5 people died in the flood", "50 people died in the flood"),
+]
+PARAPHRASES = [
+    ("Earth is flat", "the earth is actually flat"),
+    ("Vaccines cause autism", "vaccines are causing autism!"),
+]
+
+
+@pytest.fixture
+def index():
+    return ClaimIndex(path=None)
+
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT_CLAIMS)
+def test_different_claims_do_not_reuse_verdicts(index, stored, asked):
+    index.add("c1", stored, FALSE)
+    assert index.search(asked) is None
+
+
+@pytest.mark.parametrize("stored, asked", PARAPHRASES)
+def test_paraphrases_reuse_verdicts(index, stored, asked):
+    index.add("c1", stored, FALSE)
+    match = index.search(asked)
+    assert match is not None and match["claim_id"] == "c1"
+    assert match["score"].verdict == "FALSE"
+
+
+def test_remove(index):
+    index.add("c1", "Earth is flat", FALSE)
+    index.add("c2", "The moon is made of cheese", FALSE)
+    assert index.remove(["c1", "unknown"]) == 1
+    assert index.search("the earth is flat") is None
+    assert index.search("the moon is made of cheese")["claim_id"] == "c2"
+
+
+def test_compaction_evicts_from_index(tmp_path):
+    store = ClaimStore(path=str(tmp_path / "claims.db"), max_rows=1, compact_every=1)
+    index = ClaimIndex(path=None)
+    store.on_evict = index.remove
+    for text in ("Earth is flat", "The moon is made of cheese"):
+        claim = store.add(Claim(text=text, score=FALSE))
+        index.add(claim.id, claim.text, FALSE)
+    assert len(index) == 1
+    assert index.search("the earth is flat") is None
+
+
+def test_restart_indexes_claims_stored_after_the_snapshot(tmp_path):
+    store = ClaimStore(path=str(tmp_path / "claims.db"))
+    path = str(tmp_path / "index.npz")
+    index = ClaimIndex(path=path, as_of=store.last_seq)
+    first = store.add(Claim(text="Earth is flat", score=FALSE))
+    index.add(first.id, first.text, FALSE)
+    index.save()
+    # Stored after the snapshot, then the process dies before the next save
+    later = store.add(Claim(text="The moon is made of cheese", score=FALSE))
+
+    restarted = ClaimIndex(path=path, as_of=store.last_seq)
+    as_of = restarted.load()
+    assert len(restarted) == 1
+    restarted.rebuild(Claim.model_validate_json(data) for _, data in store.iter_rows(after=as_of))
+    assert len(restarted) == 2
+    assert restarted.search("the moon is made of cheese")["claim_id"] == later.id
+
+
+def test_snapshots_are_taken_as_claims_arrive(tmp_path):
+    index = ClaimIndex(path=str(tmp_path / "index.npz"), save_every=2)
+    index.add("c1", "Earth is flat", FALSE)
+    assert not (tmp_path / "index.npz").exists()
+    index.add("c2", "The moon is made of cheese", FALSE)
+    assert ClaimIndex(path=str(tmp_path / "index.npz")).load() == 0
+
+
+def test_latest_claim_with_the_same_content_wins(index):
+    index.add("c1", "Earth is flat", FALSE)
+    index.add("c2", "the earth is really flat", FALSE)
+    assert len(index) == 1
+    assert index.search("Earth is flat")["claim_id"] == "c2"
+    # The replaced claim no longer backs the entry, so evicting it leaves c2 in place
+    assert index.remove(["c1"]) == 0
+    assert index.search("Earth is flat")["claim_id"] == "c2"
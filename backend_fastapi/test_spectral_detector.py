@@ -0,0 +1,92 @@
+"""
+Local spectral detector on the camera photos in fixtures/spectral, the same
+photos upscaled, and the bench's synthetic generator-like images.
+"""
+import io
+import os
+import pytest
+from PIL import Image
+import image_analyzer
+from bench_spectral_detector import labelled_set, synthetic_set
+from image_analyzer import ImageAnalyzer, decode_image
+from spectral_detector import detect, native_crop
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+LABELLED = labelled_set(os.path.join(FIXTURES, "spectral"))
+PHOTOS = [pytest.param(data, id=name) for label, name, data in LABELLED if label == "real"]
+GENERATED = [data for label, _, data in LABELLED if label == "ai"]
+GENERATOR_METADATA = [pytest.param(os.path.join(FIXTURES, "generator_metadata", name), id=name)
+                      for name in ("automatic1111.png", "comfyui.png")]
+UPSCALES = [pytest.param(factor, method, id=f"{factor}x-{method.name.lower()}") for factor in (1.5, 2)
+            for method in (Image.Resampling.BICUBIC, Image.Resampling.BILINEAR, Image.Resampling.LANCZOS)]
+
+
+def upscale(data: bytes, factor: float, method: Image.Resampling) -> bytes:
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    buffer = io.BytesIO()
+    image.resize((int(image.width * factor), int(image.height * factor)), method).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("data", PHOTOS)
+def test_camera_photos_score_low(data):
+    assert detect(native_crop(data))["ai_probability"] < 0.3
+
+
+def test_generator_like_images_score_high():
+    scores = [detect(native_crop(data))["ai_probability"] for label, _, data in synthetic_set(6) if label == "ai"]
+    assert min(scores) > 0.9
+
+
+class RemoteModel:
+    def __init__(self):
+        self.calls = 0
+
+    def image_classification(self, image, model):
+        self.calls += 1
+        return [{"label": "real", "score": 0.9}, {"label": "artificial", "score": 0.1}]
+
+    def image_to_text(self, image, model):
+        return [{"generated_text": "a circuit board on a desk"}]
+
+
+@pytest.fixture
+def prefilter(monkeypatch):
+    monkeypatch.setattr(image_analyzer, "AI_DETECTION_MODE", "prefilter")
+    analyzer = ImageAnalyzer()
+    analyzer.hf_client = RemoteModel()
+    return analyzer
+
+
+@pytest.mark.parametrize("factor, method", UPSCALES)
+@pytest.mark.parametrize("data", PHOTOS)
+def test_prefilter_sends_upscaled_photos_to_the_remote_model(prefilter, data, factor, method):
+    result = prefilter.detect_ai_generated(decode_image(upscale(data, factor, method)))
+    assert prefilter.hf_client.calls == 1
+    assert result["verdict"] == "Likely Real Photo"
+
+
+@pytest.mark.parametrize("path", GENERATOR_METADATA)
+def test_prefilter_answers_generator_outputs_locally(prefilter, path):
+    with open(path, "rb") as f:
+        result = prefilter.detect_ai_generated(decode_image(f.read()))
+    assert prefilter.hf_client.calls == 0
+    assert result["model"] == image_analyzer.SPECTRAL_MODEL
+    assert result["verdict"] == "AI-Generated (Generator Metadata)"
+
+
+def test_prefilter_sends_stripped_generator_output_to_the_remote_model(prefilter):
+    # Pixels alone aren't enough to skip the remote model
+    prefilter.detect_ai_generated(decode_image(GENERATED[0]))
+    assert prefilter.hf_client.calls == 1
+
+
+def test_local_results_are_not_cached(monkeypatch):
+    monkeypatch.setattr(image_analyzer, "AI_DETECTION_MODE", "local")
+    analyzer = ImageAnalyzer()
+    # The description comes from the remote model, so only the local AI result can keep it out
+    analyzer.hf_client = RemoteModel()
+    result = analyzer.analyze_image(upscale(PHOTOS[0].values[0], 2, Image.Resampling.BICUBIC))
+    assert result["ai_detection"]["model"] == image_analyzer.SPECTRAL_MODEL
+    assert result["ai_detection"]["verdict"] == "Possibly AI-Generated or Upscaled (Local Analysis)"
+    assert len(analyzer.cache) == 0
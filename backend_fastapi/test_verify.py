@@ -0,0 +1,108 @@
+"""
+/api/verify with the evidence search and the LLM stubbed out, so the
+tests exercise the route's pipeline without network access.
+"""
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+import main
+from models import ScoreResponse
+
+SEARCH_RESULTS = [
+    {"title": "Fact check one", "body": "First result", "href": "https://example.org/1"},
+    {"title": "Fact check two", "body": "Second result", "href": "https://example.org/2"},
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def search(claim_text):
+        return SEARCH_RESULTS
+
+    async def ascore(claim):
+        return ScoreResponse(final_score=12, source_reliability=80, evidence_strength=75,
+                             consistency=90, verdict="FALSE")
+
+    monkeypatch.setattr(main.verify_agent, "_search", search)
+    monkeypatch.setattr(main.score_agent, "ascore", ascore)
+    return TestClient(main.app)
+
+
+def test_verify_returns_scored_claim(client):
+    response = client.post("/api/verify", data={"text": "The moon landing was staged in 2031"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["score"]["verdict"] == "FALSE"
+    assert data["claim"]["status"] == "false"
+    assert [e["url"] for e in data["claim"]["evidence"]] == ["https://example.org/1", "https://example.org/2"]
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def test_claim_store_runs_off_the_event_loop(client, monkeypatch):
+    calls = []
+    add = main.claim_store.add
+
+    def recording_add(claim):
+        calls.append(_on_event_loop())
+        return add(claim)
+
+    monkeypatch.setattr(main.claim_store, "add", recording_add)
+    client.post("/api/verify", data={"text": "A volcano erupted under the city library"})
+    assert calls == [False]
+
+
+def test_evidence_cache_runs_off_the_event_loop(monkeypatch):
+    calls = []
+    cache = main.verify_agent.search_cache
+    get, set_ = cache.get, cache.set
+
+    async def search_uncached(claim_text):
+        return SEARCH_RESULTS
+
+    def recording_get(key):
+        calls.append(("get", _on_event_loop()))
+        return get(key)
+
+    def recording_set(key, value):
+        calls.append(("set", _on_event_loop()))
+        return set_(key, value)
+
+    monkeypatch.setattr(main.verify_agent, "_search_uncached", search_uncached)
+    monkeypatch.setattr(cache, "get", recording_get)
+    monkeypatch.setattr(cache, "set", recording_set)
+    assert asyncio.run(main.verify_agent._search("The harbour froze over in July")) == SEARCH_RESULTS
+    assert calls == [("get", False), ("set", False)]
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_sse_stages_arrive_in_pipeline_order(client):
+    response = client.post("/api/verify?format=sse", data={"text": "A comet will hit the harbour on Friday"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    assert [event for event, _ in events] == ["started", "claim", "evidence", "evidence", "score", "result"]
+    assert events[0][1] == {"text": True, "link": None, "image": False}
+    assert events[-1][1]["score"]["verdict"] == "FALSE"
+
+
+def test_ndjson_stages_and_paraphrase_match(client):
+    client.post("/api/verify", data={"text": "The city aquarium released sharks into the river"})
+    response = client.post("/api/verify?format=ndjson",
+                           data={"text": "the city aquarium released the sharks into the river!"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["event"] for line in lines] == ["started", "match", "result"]
+    assert lines[-1]["data"]["match"]["claim_id"] == lines[1]["data"]["claim_id"]
@@ -0,0 +1,147 @@
+"""
+Upload Handling Module
+Copies multipart uploads into a size-capped spooled buffer in fixed chunks,
+hashing as it goes, so an upload is never held in memory as one bytes
+object and oversized files are rejected as soon as they cross the cap.
+Images given by URL are streamed under the same cap, and zip archives
+of images are vetted from their directory before anything is extracted.
+"""
+import os
+import hashlib
+import zipfile
+import tempfile
+from typing import List, NamedTuple, Optional
+import httpx
+from fastapi import UploadFile
+from link_fetcher import UnsupportedContentError, content_type_of, LINK_FETCH_TIMEOUT
+
+# Hard limit for one uploaded image
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Uploads up to this size stay in memory, larger ones spill to a temp file
+UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Batch analysis: images per request, and the largest request body (files or one zip)
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "200"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(500 * 1024 * 1024)))
+ARCHIVE_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff", ".heic")
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+        self.limit = limit
+
+
+class TooManyImagesError(ValueError):
+    def __init__(self, count: int, limit: int):
+        super().__init__(f"Archive holds {count} images, more than {limit}")
+        self.count = count
+        self.limit = limit
+
+
+class SpooledUpload(NamedTuple):
+    file: tempfile.SpooledTemporaryFile  # Rewound, ready to read
+    size: int
+    sha256: str
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES,
+                       memory_bytes: int = UPLOAD_SPOOL_MEMORY_BYTES) -> SpooledUpload:
+    """
+    Copy `upload` into a SpooledTemporaryFile, computing its SHA-256 on the
+    way. Raises UploadTooLargeError as soon as more than `max_bytes` arrive.
+    The caller owns the returned file and should close it.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledUpload(spool, size, digest.hexdigest())
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
+    """Read a whole upload in chunks, raising UploadTooLargeError past `max_bytes`."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def archive_images(archive: zipfile.ZipFile, max_images: int = BATCH_MAX_IMAGES,
+                   max_bytes: int = IMAGE_MAX_UPLOAD_BYTES,
+                   max_total_bytes: int = BATCH_MAX_BYTES) -> List[zipfile.ZipInfo]:
+    """
+    The image members of a zip, in archive order, checked from the central
+    directory alone: too many images or too much uncompressed data raises
+    before a byte is inflated. Folders, hidden files and macOS resource
+    forks are skipped. Reads stop at each member's declared size, so an
+    entry that lies about it fails its CRC check rather than growing.
+    """
+    images = [info for info in archive.infolist() if _is_image_member(info)]
+    if len(images) > max_images:
+        raise TooManyImagesError(len(images), max_images)
+    total = 0
+    for info in images:
+        if info.file_size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        total += info.file_size
+        if total > max_total_bytes:
+            raise UploadTooLargeError(max_total_bytes)
+    return images
+
+
+def _is_image_member(info: zipfile.ZipInfo) -> bool:
+    name = info.filename.replace("\\", "/")
+    base = name.rsplit("/", 1)[-1]
+    if info.is_dir() or name.startswith("__MACOSX/") or base.startswith("."):
+        return False
+    return base.lower().endswith(ARCHIVE_IMAGE_EXTENSIONS)
+
+
+async def download_image(url: str, client: Optional[httpx.AsyncClient] = None,
+                         max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Fetch an image URL, refusing non-image responses from their headers and
+    anything over `max_bytes`, declared or actual. Uses the shared client
+    when given.
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=LINK_FETCH_TIMEOUT, follow_redirects=True) as client:
+            return await download_image(url, client, max_bytes)
+
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        content_type = content_type_of(response)
+        if not content_type.startswith("image/"):
+            raise UnsupportedContentError(f"Not an image: {content_type or 'unknown content type'}")
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            chunks.append(chunk)
+    return b"".join(chunks)
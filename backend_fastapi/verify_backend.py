@@ -30,8 +30,8 @@ def test_health_check():
     print("Health check passed.")
 
 def test_verify_claim():
-    # Test verify endpoint
-    response = client.post("/api/verify", json={"text": "Test claim"})
+    # Test verify endpoint (a form, since it also takes image uploads)
+    response = client.post("/api/verify", data={"text": "Test claim"})
     assert response.status_code == 200
     data = response.json()
     assert "claim" in data
@@ -43,11 +43,12 @@ def test_verify_claim():
 
 def test_crisis_endpoint():
     # Inject a crisis claim manually
-    from main import processed_claims
-    processed_claims.append(Claim(
+    from main import claim_store, crisis_agent
+    claim = claim_store.add(Claim(
         text="Major earthquake reported",
         status="verified"
     ))
+    crisis_agent.ingest([claim])
     
     response = client.get("/api/crisis")
     assert response.status_code == 200
@@ -0,0 +1,51 @@
+"""
+Worker Process Pool
+One process pool for the app's CPU-heavy, pure functions of image bytes
+(forensic checks, batch decoding), so they neither hold the event loop nor
+contend for the GIL with request handling. Started in the app lifespan;
+until start() (scripts, tests) work runs in a thread instead.
+"""
+import os
+import asyncio
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+
+
+class WorkerPool:
+    def __init__(self, workers: int = WORKER_PROCESSES):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.completed: Counter = Counter()
+
+    def start(self):
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            # Start the workers now, while the process is still quiet, not on the first request
+            self._pool.submit(int).result()
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a module-level function in a worker; arguments and result must pickle."""
+        if self._pool is None:
+            result = await asyncio.to_thread(fn, *args)
+        else:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); replace the pool for the next request
+                self._pool = None
+                self.start()
+                raise
+        self.completed[fn.__name__] += 1
+        return result
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        return {"workers": self.workers, "running": self._pool is not None, "completed": dict(self.completed)}